@@ -10,20 +10,24 @@ if __package__ is None or __package__ == "":
 import shutil
 from pathlib import Path
 
-from backend.embeddings.vector_store import add_records, clear_index, has_index
+from backend.embeddings.doc_registry import content_hash, pdf_doc_id, web_doc_id
 from backend.evaluation.answer_evaluator import evaluate_answer
 from backend.evaluation.source_attribution import extract_sources
-from backend.ingestion.pdf_loader import load_pdf_pages
+from backend.ingestion import pipeline
+from backend.ingestion.pdf_loader import file_hash
 from backend.ingestion.text_cleaner import normalize_text
 from backend.ingestion.web_cache_loader import get_web_text
 from backend.llm.answer_guard import guard_answer
 from backend.llm.llm_client import generate_answer
 from backend.llm.prompt_builder import build_prompt, format_context
-from backend.processing.chunker import make_chunks
-from backend.retrieval.retriever import retrieve_chunks
-from backend.utils.paths import raw_pdfs_dir, raw_text_dir
+from backend.utils.paths import raw_pdfs_dir
+
+# The vector store (FAISS) is imported inside the functions that use it: the
+# PDF extraction workers re-import this script.
 
 def run_query(query: str, top_k: int = 5):
+    from backend.retrieval.retriever import retrieve_chunks
+
     # -------- Step 8: Retrieval --------
     retrieved_chunks, similarity_scores = retrieve_chunks(query, top_k=top_k)
 
@@ -64,50 +68,34 @@ def run_query(query: str, top_k: int = 5):
 
 
 def ingest_pdf_path(pdf_path: Path) -> int:
-    pages = load_pdf_pages(str(pdf_path))
-    if not pages:
-        raise ValueError("No extractable text found in the PDF.")
+    from backend.embeddings.vector_store import document_status
 
-    raw_text_dir().mkdir(parents=True, exist_ok=True)
-    combined_text = "\n\n".join(p["text"] for p in pages)
-    combined_text = normalize_text(combined_text)
-    (raw_text_dir() / f"{pdf_path.stem}.txt").write_text(combined_text, encoding="utf-8")
-
-    records: list[dict] = []
-    for p in pages:
-        page_num = int(p["page"])
-        page_text = normalize_text(p["text"])
-        if not page_text:
-            continue
-
-        for chunk in make_chunks(page_text):
-            records.append(
-                {
-                    "text": chunk,
-                    "type": "pdf",
-                    "file": pdf_path.name,
-                    "page": page_num,
-                    "source": f"{pdf_path.name} (page {page_num})",
-                }
-            )
-
-    add_records(records)
-    return len(records)
+    doc_id = pdf_doc_id(pdf_path.name)
+    doc_hash = file_hash(pdf_path)
+    if document_status(doc_id, doc_hash) == "unchanged":
+        return 0
+
+    # Pages are chunked, embedded and stored in batches as they are extracted.
+    chunks = pipeline.ingest_pdf(pdf_path, doc_id, doc_hash)
+    if chunks == 0:
+        raise ValueError("No extractable text found in the PDF.")
+    return chunks or 0
 
 
 def ingest_url_text(url: str) -> int:
+    from backend.embeddings.vector_store import document_status
+
     text = get_web_text(url)
     text = normalize_text(text)
     if not text:
         raise ValueError("No extractable text found on the page.")
 
-    records = [
-        {"text": chunk, "type": "web", "url": url, "source": url}
-        for chunk in make_chunks(text)
-    ]
+    doc_id = web_doc_id(url)
+    doc_hash = content_hash(text)
+    if document_status(doc_id, doc_hash) == "unchanged":
+        return 0
 
-    add_records(records)
-    return len(records)
+    return pipeline.ingest_web_text(url, text, doc_id, doc_hash) or 0
 
 
 def _prompt_choice() -> str:
@@ -182,6 +170,8 @@ def ingest_url() -> None:
 
 
 def main() -> None:
+    from backend.embeddings.vector_store import clear_index, has_index
+
     print("RAG QA Engine")
     print("Step 1: Ingest a PDF or a URL (cached)")
     print("Step 2: Build/update vectors (FAISS)")
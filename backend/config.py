@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() not in {"0", "false", "no"}
+
+
+# Rows appended since the last compaction are searched brute force; once this
+# many have accumulated a background thread folds them into the FAISS index.
+COMPACT_MIN_ROWS = _env_int("RAG_COMPACT_MIN_ROWS", 4096)
+
+# FAISS index type: "flat", "ivf_flat", "ivf_pq", "hnsw", the compressed flat
+# scans "sq8", "fp16" and "pq", or "auto". With "auto" the store stays brute
+# force until ANN_MIN_ROWS records and then migrates to ANN_INDEX_TYPE at the
+# next compaction.
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto").strip().lower()
+ANN_INDEX_TYPE = os.getenv("RAG_ANN_INDEX_TYPE", "hnsw").strip().lower()
+ANN_MIN_ROWS = _env_int("RAG_ANN_MIN_ROWS", 200_000)
+
+# Query-time accuracy/speed knobs for IVF (lists probed) and HNSW (beam width).
+NPROBE = _env_int("RAG_NPROBE", 16)
+EF_SEARCH = _env_int("RAG_EF_SEARCH", 64)
+
+# Compressed indexes (sq8, fp16, pq, ivf_pq) fetch top_k * RESCORE_FACTOR
+# candidates and re-rank them exactly from the float32 copy; 1 disables it.
+RESCORE_FACTOR = _env_int("RAG_RESCORE_FACTOR", 4)
+
+# Sentence-transformers batch size and torch intra-op threads (0 = torch default).
+EMBED_BATCH_SIZE = _env_int("RAG_EMBED_BATCH_SIZE", 64)
+EMBED_THREADS = _env_int("RAG_EMBED_THREADS", 0)
+
+# Persist embeddings by content hash so unchanged chunks are never re-encoded.
+EMBED_CACHE_ENABLED = _env_flag("RAG_EMBED_CACHE", True)
+
+# Deleted chunks are only tombstoned; once they make up this fraction of the
+# stored rows a background pass rewrites the data without them.
+RECLAIM_TOMBSTONE_RATIO = float(os.getenv("RAG_RECLAIM_TOMBSTONE_RATIO", "0.2"))
+
+# A document being ingested is leased to its writer. A second ingest of the
+# same document is refused until the lease is released, or has gone this long
+# without a write (its writer crashed).
+WRITER_LEASE_SECONDS = _env_int("RAG_WRITER_LEASE_SECONDS", 600)
+
+# SQLite mmap window for the record store (records.sqlite).
+RECORDS_MMAP_BYTES = _env_int("RAG_RECORDS_MMAP_BYTES", 1 << 30)
+
+# Memory-map faiss_index.bin and the vector files instead of reading them into
+# RAM: cold starts stay fast and worker processes share the OS page cache. Off
+# by default on Windows, where a mapped file cannot be replaced by compaction.
+INDEX_MMAP = _env_flag("RAG_INDEX_MMAP", os.name != "nt")
+
+# PDF extraction: worker processes (0 = CPU count, capped at 8; 1 = serial),
+# pages per task, and the page count below which a PDF is read serially.
+PDF_WORKERS = _env_int("RAG_PDF_WORKERS", 0)
+PDF_PAGES_PER_TASK = _env_int("RAG_PDF_PAGES_PER_TASK", 16)
+PDF_PARALLEL_MIN_PAGES = _env_int("RAG_PDF_PARALLEL_MIN_PAGES", 32)
+
+# PDF text extractor: "pymupdf", "pypdfium2", "pdfplumber", or "auto" for
+# the fastest one installed. Extracted pages are cached by PDF content hash.
+PDF_BACKEND = os.getenv("RAG_PDF_BACKEND", "auto").strip().lower()
+PDF_PAGE_CACHE_ENABLED = _env_flag("RAG_PDF_PAGE_CACHE", True)
+
+# Streaming ingestion: chunks are embedded and appended in batches of at most
+# this many chunks / MiB of text, so ingest memory does not grow with the
+# document.
+INGEST_BATCH_CHUNKS = _env_int("RAG_INGEST_BATCH_CHUNKS", 256)
+INGEST_BATCH_MB = _env_int("RAG_INGEST_BATCH_MB", 8)
+
+# Web fetching: requests in flight overall and per host, and how long (in
+# seconds) a cached page is served before it is revalidated with a
+# conditional GET.
+WEB_CONCURRENCY = _env_int("RAG_WEB_CONCURRENCY", 16)
+WEB_PER_HOST = _env_int("RAG_WEB_PER_HOST", 4)
+WEB_MAX_AGE = _env_int("RAG_WEB_MAX_AGE", 3600)
+
+# HTML to text: "lxml" (single pass, drops nav/footer, keeps headings as
+# paragraph breaks), "html.parser" (BeautifulSoup), or "auto" for lxml when
+# it is installed.
+HTML_PARSER = os.getenv("RAG_HTML_PARSER", "auto").strip().lower()
+
+# Chunking: "tokens" sizes chunks in the embedding model's word-piece tokens
+# to fit its input window (overlapping by CHUNK_OVERLAP_TOKENS); "words" is
+# the original 400-word chunker, most of whose chunks the model truncates.
+CHUNK_MODE = os.getenv("RAG_CHUNK_MODE", "tokens").strip().lower()
+CHUNK_OVERLAP_TOKENS = _env_int("RAG_CHUNK_OVERLAP_TOKENS", 48)
+
+# Near-duplicate chunks (estimated Jaccard similarity of word 5-shingles at
+# or above this) are embedded once per document and collapsed in search
+# results; 0 disables both.
+NEAR_DUP_THRESHOLD = float(os.getenv("RAG_NEAR_DUP_THRESHOLD", "0.9"))
+
+# Retrieval: "hybrid" fuses BM25 keyword hits with dense vector hits by
+# reciprocal rank fusion (constant RRF_K), so exact identifiers, error codes
+# and config keys are found; "dense" is vector search only. Each ranking
+# contributes HYBRID_CANDIDATES candidates (at least top_k) to the fusion.
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").strip().lower()
+RRF_K = _env_int("RAG_RRF_K", 60)
+HYBRID_CANDIDATES = _env_int("RAG_HYBRID_CANDIDATES", 50)
+
+# Filtered searches matching at most this many chunks score them exactly from
+# the stored vectors; larger matches search the index through an IDSelector.
+FILTER_EXACT_ROWS = _env_int("RAG_FILTER_EXACT_ROWS", 20_000)
+
+# LLM calls in flight at once: per `ask_many` batch, and per event loop on
+# the async path (`aask`, `aask_many`).
+LLM_CONCURRENCY = _env_int("RAG_LLM_CONCURRENCY", 8)
+
+# HTTP service (`backend.server`): most questions accepted per /ask/batch call.
+SERVER_MAX_BATCH = _env_int("RAG_SERVER_MAX_BATCH", 64)
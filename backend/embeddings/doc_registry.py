@@ -0,0 +1,98 @@
+"""Which documents are in the vector store, and the content they were built from.
+
+`documents.json` in `data/vectors/` maps a source id (`pdf:<file name>` or
+`web:<url>`) to the hash of the ingested content and the id ranges of its
+chunks, so re-ingesting unchanged input can be skipped and a changed or
+retired document's chunks can be found without scanning the store. While a
+new version is being streamed in, its chunks are tracked separately until it
+is complete.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from backend.utils.paths import vectors_dir
+
+
+@dataclass(frozen=True)
+class Document:
+    doc_id: str
+    content_hash: str
+    chunks: int
+    # Half-open [start, stop) ranges of vector ids holding this document's chunks.
+    id_ranges: tuple[tuple[int, int], ...] = ()
+    # Chunks already appended by an ingest of a newer version that has not
+    # finished (or crashed); they replace `id_ranges` once it completes.
+    pending_ranges: tuple[tuple[int, int], ...] = ()
+    # Token of the writer holding the document, and when its lease runs out.
+    writer: str = ""
+    lease_expires: float = 0.0
+
+
+def registry_path() -> Path:
+    return vectors_dir() / "documents.json"
+
+
+def pdf_doc_id(file_name: str) -> str:
+    return f"pdf:{file_name}"
+
+
+def web_doc_id(url: str) -> str:
+    return f"web:{url}"
+
+
+def content_hash(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _ranges(raw) -> tuple[tuple[int, int], ...]:
+    return tuple((int(a), int(b)) for a, b in raw)
+
+
+def add_range(
+    ranges: tuple[tuple[int, int], ...], new: tuple[int, int]
+) -> tuple[tuple[int, int], ...]:
+    """Append `new`, merging it into the last range when they are adjacent."""
+    if ranges and ranges[-1][1] == new[0]:
+        return ranges[:-1] + ((ranges[-1][0], new[1]),)
+    return ranges + (new,)
+
+
+def load() -> dict[str, Document]:
+    try:
+        raw = json.loads(registry_path().read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    documents: dict[str, Document] = {}
+    for doc_id, entry in raw.items():
+        documents[doc_id] = Document(
+            doc_id=doc_id,
+            content_hash=entry["content_hash"],
+            chunks=int(entry["chunks"]),
+            id_ranges=_ranges(entry.get("id_ranges", ())),
+            pending_ranges=_ranges(entry.get("pending_ranges", ())),
+            writer=entry.get("writer", ""),
+            lease_expires=float(entry.get("lease_expires", 0.0)),
+        )
+    return documents
+
+
+def save(documents: dict[str, Document]) -> None:
+    """Atomically persist the registry. Caller holds the vector write lock."""
+    vectors_dir().mkdir(parents=True, exist_ok=True)
+    raw = {}
+    for doc_id, doc in documents.items():
+        entry = asdict(doc)
+        del entry["doc_id"]
+        raw[doc_id] = entry
+
+    tmp = registry_path().with_suffix(".tmp")
+    tmp.write_text(json.dumps(raw, indent=1), encoding="utf-8")
+    os.replace(tmp, registry_path())
@@ -1,20 +1,143 @@
 from __future__ import annotations
 
-from sentence_transformers import SentenceTransformer
+from dataclasses import dataclass
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from backend.config import EMBED_BATCH_SIZE, EMBED_CACHE_ENABLED, EMBED_THREADS
+from backend.embeddings import embedding_cache
+from backend.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 MODEL_NAME = "all-MiniLM-L6-v2"
 _MODEL: SentenceTransformer | None = None
+_MODEL_LOCK = threading.Lock()
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class EncodeStats:
+    chunks: int
+    seconds: float
+    batch_size: int
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+
+_last_stats: EncodeStats | None = None
 
 
 def load_model() -> SentenceTransformer:
+    """Return the process-wide model; every embedding in the app goes through it.
+
+    sentence_transformers (and torch) are imported here, not at module level,
+    so processes that never embed (e.g. PDF extraction workers) stay light.
+    """
     global _MODEL
     if _MODEL is None:
-        _MODEL = SentenceTransformer(MODEL_NAME)
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                from sentence_transformers import SentenceTransformer
+
+                if EMBED_THREADS > 0:
+                    import torch
+
+                    torch.set_num_threads(EMBED_THREADS)
+                _MODEL = SentenceTransformer(MODEL_NAME)
     return _MODEL
 
 
-def embed_chunks(chunks: list[str]):
+def tokenizer():
+    """The model's word-piece tokenizer, i.e. what `encode` measures and truncates with."""
+    return load_model().tokenizer
+
+
+def max_tokens() -> int:
+    """Text tokens the model embeds per input: its max_seq_length minus [CLS] and [SEP]."""
+    return load_model().max_seq_length - 2
+
+
+def encode(
+    texts: list[str], batch_size: int | None = None, show_progress_bar: bool = False
+) -> np.ndarray:
+    """Embed `texts` as a float32 (n, dim) array, in input order.
+
+    `SentenceTransformer.encode` already sorts each call's inputs by length
+    before batching (and restores the order), so passing the whole list in one
+    call keeps padding minimal; splitting it up here would defeat that.
+    """
+    global _last_stats
     model = load_model()
-    return model.encode(chunks, show_progress_bar=True)
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    start = time.perf_counter()
+    embeddings = model.encode(
+        texts, batch_size=batch_size, show_progress_bar=show_progress_bar
+    )
+    stats = EncodeStats(chunks=len(texts), seconds=time.perf_counter() - start, batch_size=batch_size)
+    _last_stats = stats
+    if len(texts) > 1:
+        logger.info(
+            "embedded %d chunks in %.2fs (%.1f chunks/sec, batch_size=%d)",
+            stats.chunks,
+            stats.seconds,
+            stats.chunks_per_sec,
+            batch_size,
+        )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def encode_cached(texts: list[str], show_progress_bar: bool = False) -> np.ndarray:
+    """Like `encode`, but only runs the model on texts not seen before.
+
+    Vectors are looked up in the persistent content-addressed cache keyed by
+    (model, normalized text); misses are encoded in one call and stored.
+    """
+    if not EMBED_CACHE_ENABLED or not texts:
+        return encode(texts, show_progress_bar=show_progress_bar)
+
+    keys = [embedding_cache.chunk_key(MODEL_NAME, t) for t in texts]
+    cached = embedding_cache.get_many(keys)
+
+    missing: dict[str, str] = {}
+    for key, text in zip(keys, texts, strict=True):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    if missing:
+        new_vectors = encode(list(missing.values()), show_progress_bar=show_progress_bar)
+        embedding_cache.put_many(list(missing), new_vectors)
+        cached.update(zip(missing, new_vectors, strict=True))
 
+    if len(texts) > 1:
+        logger.info("embedding cache: %d of %d chunks reused", len(texts) - len(missing), len(texts))
+    return np.stack([cached[k] for k in keys]).astype(np.float32, copy=False)
 
+
+def encode_query(query: str) -> np.ndarray:
+    """Embed a single query as a (1, dim) array."""
+    return encode([query])
+
+
+def encode_queries(queries: list[str]) -> np.ndarray:
+    """Embed several queries as one (n, dim) batch, in input order."""
+    return encode(queries)
+
+
+def last_stats() -> EncodeStats | None:
+    """Throughput of the most recent `encode` call in this process."""
+    return _last_stats
+
+
+def embed_chunks(chunks: list[str]):
+    return encode(chunks, show_progress_bar=True)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+import sqlite3
+import threading
+
+import numpy as np
+
+from backend.utils.paths import cache_dir
+
+_SQL_BATCH = 500
+_local = threading.local()
+
+
+def _cache_path() -> Path:
+    return cache_dir() / "embeddings.sqlite"
+
+
+def _connect() -> sqlite3.Connection:
+    path = _cache_path()
+    conn: sqlite3.Connection | None = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+    )
+    _local.conn = conn
+    _local.path = path
+    return conn
+
+
+def chunk_key(model_name: str, text: str) -> str:
+    # Whitespace runs are collapsed: the word-piece tokenizer ignores them, so
+    # texts that differ only in spacing embed identically.
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{model_name}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+def get_many(keys: list[str]) -> dict[str, np.ndarray]:
+    conn = _connect()
+    found: dict[str, np.ndarray] = {}
+    unique = list(dict.fromkeys(keys))
+    for i in range(0, len(unique), _SQL_BATCH):
+        batch = unique[i : i + _SQL_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(
+            f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+        )
+        for key, blob in rows:
+            found[key] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def put_many(keys: list[str], vectors: np.ndarray) -> None:
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [
+                (key, np.asarray(vec, dtype=np.float32).tobytes())
+                for key, vec in zip(keys, vectors, strict=True)
+            ],
+        )
+
+
+def clear() -> None:
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM embeddings")
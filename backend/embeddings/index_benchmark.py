@@ -0,0 +1,160 @@
+"""Recall, latency and size of the index types against the flat baseline.
+
+Run on the persisted vectors (or random data if none exist yet):
+
+    python -m backend.embeddings.index_benchmark --queries 200 --top-k 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from backend.config import RESCORE_FACTOR
+from backend.embeddings import index_types, vector_log
+
+NPROBE_SWEEP = (1, 4, 16, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128)
+
+
+def _split(vectors: np.ndarray, n_queries: int) -> tuple[np.ndarray, np.ndarray]:
+    """Hold out `n_queries` stored vectors as queries; index the rest."""
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(vectors))
+    return vectors[order[n_queries:]], vectors[order[:n_queries]]
+
+
+def _timed_search(
+    index, queries: np.ndarray, top_k: int, params, rescore_from: np.ndarray | None = None
+) -> tuple[np.ndarray, float]:
+    """Search and return (ids, ms per query).
+
+    With `rescore_from` (the float vectors, indexed by id) the index is asked
+    for `RESCORE_FACTOR` times more candidates, re-ranked exactly.
+    """
+    start = time.perf_counter()
+    if rescore_from is None:
+        _, ids = index.search(queries, top_k, params=params)
+    else:
+        _, candidates = index.search(queries, top_k * RESCORE_FACTOR, params=params)
+        ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        for row, (query, found) in enumerate(zip(queries, candidates, strict=True)):
+            found = found[found >= 0]
+            _, best = index_types.rescore(query, found, rescore_from[found], top_k)
+            ids[row, : len(best)] = best
+    elapsed = time.perf_counter() - start
+    return ids, elapsed * 1000.0 / len(queries)
+
+
+def _bytes_per_vector(index) -> float:
+    return len(faiss.serialize_index(index)) / max(1, index.ntotal)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth, strict=False))
+    return hits / truth.size
+
+
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 5,
+    types: tuple[str, ...] = index_types.INDEX_TYPES,
+) -> list[dict]:
+    """Return one row per (index type, search setting) with recall, latency and size.
+
+    Compressed types get a second row per setting with exact re-scoring.
+    """
+    flat = index_types.build("flat", vectors)
+    truth, flat_ms = _timed_search(flat, queries, top_k, None)
+    rows = [
+        {
+            "type": "flat",
+            "setting": "-",
+            "recall": 1.0,
+            "ms_per_query": flat_ms,
+            "build_s": 0.0,
+            "bytes_per_vector": _bytes_per_vector(flat),
+        }
+    ]
+
+    for index_type in types:
+        if index_type == "flat":
+            continue
+        start = time.perf_counter()
+        index = index_types.build(index_type, vectors)
+        build_s = time.perf_counter() - start
+        built_as = index_types.index_type_of(index)
+        if built_as != index_type:
+            print(f"skipping {index_type}: {len(vectors)} vectors is too few to train it")
+            continue
+
+        if index_type == "hnsw":
+            sweep = [(f"efSearch={ef}", index_types.search_params(index, ef_search=ef)) for ef in EF_SEARCH_SWEEP]
+        elif index_type in ("ivf_flat", "ivf_pq"):
+            sweep = [(f"nprobe={n}", index_types.search_params(index, nprobe=n)) for n in NPROBE_SWEEP]
+        else:
+            sweep = [("-", index_types.search_params(index))]
+
+        size = _bytes_per_vector(index)
+        rescore_modes = [None]
+        if index_type in index_types.LOSSY_TYPES and RESCORE_FACTOR > 1:
+            rescore_modes.append(vectors)
+        for setting, params in sweep:
+            for rescore_from in rescore_modes:
+                ids, ms = _timed_search(index, queries, top_k, params, rescore_from)
+                rows.append(
+                    {
+                        "type": index_type,
+                        "setting": setting if rescore_from is None else f"{setting} +rescore x{RESCORE_FACTOR}",
+                        "recall": recall_at_k(ids, truth),
+                        "ms_per_query": ms,
+                        "build_s": build_s,
+                        "bytes_per_vector": size,
+                    }
+                )
+    return rows
+
+
+def format_report(rows: list[dict], top_k: int) -> str:
+    lines = [
+        f"{'type':<10}{'setting':<24}{f'recall@{top_k}':>10}{'ms/query':>10}"
+        f"{'build s':>10}{'bytes/vec':>11}"
+    ]
+    for r in rows:
+        lines.append(
+            f"{r['type']:<10}{r['setting']:<24}{r['recall']:>10.3f}"
+            f"{r['ms_per_query']:>10.3f}{r['build_s']:>10.1f}{r['bytes_per_vector']:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", default=list(index_types.INDEX_TYPES))
+    parser.add_argument(
+        "--random", type=int, default=0, help="use N random 384-dim vectors instead of stored data"
+    )
+    args = parser.parse_args()
+
+    meta = vector_log.read_meta()
+    if args.random or meta is None:
+        n = args.random or 20_000
+        vectors = np.random.default_rng(1).standard_normal((n, 384)).astype(np.float32)
+    else:
+        vectors = vector_log.read_vectors(meta, 0, meta.rows)
+
+    n_queries = min(args.queries, max(1, len(vectors) // 10))
+    base, queries = _split(vectors, n_queries)
+    rows = recall_report(base, queries, top_k=args.top_k, types=tuple(args.types))
+    print(f"{len(base)} vectors, {len(queries)} held-out queries")
+    print(format_report(rows, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import math
+
+import faiss
+import numpy as np
+
+from backend.config import ANN_INDEX_TYPE, ANN_MIN_ROWS, EF_SEARCH, INDEX_TYPE, NPROBE
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "fp16", "pq")
+# Types whose stored codes only approximate the vectors (4x, 2x and ~32x
+# smaller than float32); their distances can be re-scored exactly.
+LOSSY_TYPES = ("ivf_pq", "sq8", "fp16", "pq")
+
+HNSW_M = 32
+PQ_BITS = 8
+# k-means wants ~40-256 points per centroid; more only slows training.
+_TRAIN_POINTS_PER_CENTROID = 128
+# Below these sizes there is not enough data to train; brute force is used.
+_MIN_TRAIN_ROWS = {"ivf_flat": 39 * 16, "ivf_pq": 39 * 2 ** PQ_BITS, "pq": 39 * 2 ** PQ_BITS}
+
+
+def choose_index_type(n_rows: int, requested: str | None = None) -> str:
+    """Resolve `requested` (default: the configured type), applying the `auto` policy."""
+    requested = requested or INDEX_TYPE
+    if requested != "auto":
+        return requested
+    return ANN_INDEX_TYPE if n_rows >= ANN_MIN_ROWS else "flat"
+
+
+def buildable_type(index_type: str, n_rows: int) -> str:
+    """The type `build` actually produces for `index_type` over `n_rows` vectors."""
+    if n_rows < _MIN_TRAIN_ROWS.get(index_type, 0):
+        return "flat"
+    return index_type
+
+
+def _nlist(n_rows: int) -> int:
+    # Usual rule of thumb: ~4*sqrt(n) lists, with at least 39 points per list.
+    return max(1, min(int(4 * math.sqrt(n_rows)), n_rows // 39))
+
+
+def _pq_m(dim: int) -> int:
+    # Largest divisor of `dim` giving sub-vectors of at least 8 dims.
+    for m in range(dim // 8, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def factory_string(index_type: str, dim: int, n_rows: int) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{_nlist(n_rows)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{_nlist(n_rows)},PQ{_pq_m(dim)}x{PQ_BITS}"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "fp16":
+        return "SQfp16"
+    if index_type == "pq":
+        # A single inverted list is an exhaustive PQ scan; unlike IndexPQ it
+        # accepts the IDSelector used to skip deleted rows.
+        return f"IVF1,PQ{_pq_m(dim)}x{PQ_BITS}"
+    raise ValueError(f"Unknown index type: {index_type!r} (expected one of {INDEX_TYPES})")
+
+
+def build(index_type: str, vectors: np.ndarray, add: bool = True) -> faiss.Index:
+    """Create an index of `index_type`, train it on `vectors` and (optionally) add them."""
+    n_rows, dim = vectors.shape
+    index_type = buildable_type(index_type, n_rows)
+
+    index = faiss.index_factory(int(dim), factory_string(index_type, int(dim), int(n_rows)))
+    if not index.is_trained:
+        ivf = _ivf(index)
+        nlist = ivf.nlist if ivf is not None else 1
+        limit = max(nlist, 2 ** PQ_BITS) * _TRAIN_POINTS_PER_CENTROID
+        sample = vectors
+        if n_rows > limit:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n_rows, size=limit, replace=False)]
+        index.train(np.ascontiguousarray(sample))
+    if add:
+        index.add(vectors)
+    return index
+
+
+def _unwrap(index: faiss.Index) -> faiss.Index:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def _ivf(index: faiss.Index) -> faiss.IndexIVF | None:
+    index = _unwrap(index)
+    return index if isinstance(index, faiss.IndexIVF) else None
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = _unwrap(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "pq" if index.nlist == 1 else "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    return "flat"
+
+
+def rescore(
+    query: np.ndarray, ids: np.ndarray, vectors: np.ndarray, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Re-rank candidate `ids` by exact squared L2 to their float `vectors`.
+
+    Returns the best `top_k` as (distances, ids), nearest first.
+    """
+    distances = ((np.asarray(vectors, dtype=np.float32) - query.reshape(-1)) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:top_k]
+    return distances[order], ids[order]
+
+
+def search_params(
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    sel: faiss.IDSelector | None = None,
+) -> faiss.SearchParameters | None:
+    """Per-query search parameters (thread-safe, unlike setting them on the index).
+
+    `sel` restricts the search to the ids it accepts; the caller must keep it
+    alive until the search returns.
+    """
+    index_type = index_type_of(index)
+    if index_type in ("ivf_flat", "ivf_pq", "pq"):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or NPROBE), sel=sel)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or EF_SEARCH), sel=sel)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
+
+
+__all__ = [
+    "INDEX_TYPES",
+    "LOSSY_TYPES",
+    "build",
+    "choose_index_type",
+    "index_type_of",
+    "rescore",
+    "search_params",
+]
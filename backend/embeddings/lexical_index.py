@@ -0,0 +1,209 @@
+"""BM25 inverted index over the chunk records, in `records.sqlite`.
+
+Postings live next to the records and are written in the same transactions
+(see `record_store`), so the index grows with every append and shrinks with
+every reclaim instead of being rebuilt. Terms are lower-cased words; compound
+identifiers such as `max_connections`, `ERR_CONN_RESET` or
+`spark.executor.memory` are indexed whole as well as by their parts, so
+pasted error codes and config keys match exactly.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable, Sequence
+import math
+import re
+import sqlite3
+from typing import Any
+
+import numpy as np
+
+from backend.config import RRF_K
+
+K1 = 1.2
+B = 0.75
+MAX_TERM_CHARS = 64
+_SQL_BATCH = 500
+
+_WORD = re.compile(r"[^\W_]+")
+# Words joined by `_ . - : /` without spaces: identifiers, keys, codes, paths.
+_COMPOUND = re.compile(r"[^\W_]+(?:[._\-:/]+[^\W_]+)+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i if in into is it its of on or"
+    " that the their then there these this to was were what when where which who why"
+    " will with".split()
+)
+
+
+def terms(text: str) -> list[str]:
+    """Index terms of `text` (in no particular order), repeated as often as they occur."""
+    text = text.lower()
+    out = [t for t in _COMPOUND.findall(text) if len(t) <= MAX_TERM_CHARS]
+    out.extend(w for w in _WORD.findall(text) if w not in STOPWORDS and len(w) <= MAX_TERM_CHARS)
+    return out
+
+
+def init(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS lexical_terms (
+            id INTEGER PRIMARY KEY,
+            term TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS lexical_postings (
+            term INTEGER NOT NULL,
+            id INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (term, id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS lexical_postings_id ON lexical_postings (id);
+        CREATE TABLE IF NOT EXISTS lexical_docs (
+            id INTEGER PRIMARY KEY,
+            length INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS lexical_stats (
+            key INTEGER PRIMARY KEY CHECK (key = 0),
+            docs INTEGER NOT NULL,
+            tokens INTEGER NOT NULL
+        );
+        """
+    )
+    _backfill(conn)
+
+
+def _backfill(conn: sqlite3.Connection) -> None:
+    """Index the records of a store written before the lexical index existed."""
+    if conn.execute("SELECT 1 FROM lexical_stats").fetchone() is not None:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM lexical_stats").fetchone() is None:
+            conn.execute("INSERT INTO lexical_stats (key, docs, tokens) VALUES (0, 0, 0)")
+            rows = conn.execute("SELECT id, text FROM records")
+            while batch := rows.fetchmany(_SQL_BATCH):
+                add(conn, [{"id": i, "text": t} for i, t in batch])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _term_ids(conn: sqlite3.Connection, values: Sequence[str], create: bool) -> dict[str, int]:
+    if create:
+        conn.executemany("INSERT OR IGNORE INTO lexical_terms (term) VALUES (?)", [(v,) for v in values])
+    out: dict[str, int] = {}
+    for i in range(0, len(values), _SQL_BATCH):
+        batch = list(values[i : i + _SQL_BATCH])
+        rows = conn.execute(
+            f"SELECT term, id FROM lexical_terms WHERE term IN ({','.join('?' * len(batch))})", batch
+        )
+        out.update(rows)
+    return out
+
+
+def add(conn: sqlite3.Connection, records: list[dict[str, Any]]) -> None:
+    """Index `records` (with their `id`); the caller owns the transaction."""
+    counts = [(int(r["id"]), Counter(terms(r["text"]))) for r in records]
+    ids = _term_ids(conn, list({t for _, c in counts for t in c}), create=True)
+    conn.executemany(
+        "INSERT OR REPLACE INTO lexical_postings (term, id, tf) VALUES (?, ?, ?)",
+        [(ids[t], record_id, tf) for record_id, c in counts for t, tf in c.items()],
+    )
+    lengths = [(record_id, c.total()) for record_id, c in counts]
+    conn.executemany("INSERT OR REPLACE INTO lexical_docs (id, length) VALUES (?, ?)", lengths)
+    conn.execute(
+        "UPDATE lexical_stats SET docs = docs + ?, tokens = tokens + ?",
+        (len(lengths), sum(n for _, n in lengths)),
+    )
+
+
+def _remove(conn: sqlite3.Connection, where: str, params: Sequence[Any]) -> None:
+    docs, tokens = conn.execute(
+        f"SELECT count(*), coalesce(sum(length), 0) FROM lexical_docs WHERE {where}", params
+    ).fetchone()
+    if not docs:
+        return
+    conn.execute(f"DELETE FROM lexical_postings WHERE {where}", params)
+    conn.execute(f"DELETE FROM lexical_docs WHERE {where}", params)
+    conn.execute("UPDATE lexical_stats SET docs = docs - ?, tokens = tokens - ?", (docs, tokens))
+
+
+def delete_ids(conn: sqlite3.Connection, ids: Sequence[int]) -> None:
+    for i in range(0, len(ids), _SQL_BATCH):
+        batch = [int(x) for x in ids[i : i + _SQL_BATCH]]
+        _remove(conn, f"id IN ({','.join('?' * len(batch))})", batch)
+
+
+def delete_from(conn: sqlite3.Connection, first_id: int) -> None:
+    """Drop every id at or past `first_id` (left over from a crashed writer)."""
+    _remove(conn, "id >= ?", (first_id,))
+
+
+def clear(conn: sqlite3.Connection) -> None:
+    # Terms are kept, as `record_store` keeps its interned strings.
+    conn.execute("DELETE FROM lexical_postings")
+    conn.execute("DELETE FROM lexical_docs")
+    conn.execute("UPDATE lexical_stats SET docs = 0, tokens = 0")
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    top_k: int,
+    keep: Callable[[np.ndarray], np.ndarray] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return (ids, BM25 scores) of the best `top_k` matches, best first.
+
+    `keep` maps an array of candidate ids to a boolean mask of those that may
+    be returned (e.g. not deleted).
+    """
+    empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    query_terms = list(dict.fromkeys(terms(query)))
+    row = conn.execute("SELECT docs, tokens FROM lexical_stats").fetchone()
+    if not query_terms or row is None or row[0] == 0:
+        return empty
+    docs, tokens = row
+    avg_length = tokens / docs if tokens else 1.0
+
+    all_ids: list[np.ndarray] = []
+    all_scores: list[np.ndarray] = []
+    for term_id in _term_ids(conn, query_terms, create=False).values():
+        postings = conn.execute(
+            "SELECT p.id, p.tf, d.length FROM lexical_postings p"
+            " JOIN lexical_docs d ON d.id = p.id WHERE p.term = ?",
+            (term_id,),
+        ).fetchall()
+        if not postings:
+            continue
+        arr = np.asarray(postings, dtype=np.float64)
+        idf = math.log(1.0 + (docs - len(arr) + 0.5) / (len(arr) + 0.5))
+        tf, length = arr[:, 1], arr[:, 2]
+        all_ids.append(arr[:, 0].astype(np.int64))
+        all_scores.append(idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length)))
+    if not all_ids:
+        return empty
+
+    ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+    if keep is not None:
+        mask = keep(ids)
+        ids, scores = ids[mask], scores[mask]
+    k = min(top_k, len(ids))
+    if k == 0:
+        return empty
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.lexsort((ids[best], -scores[best]))]
+    return ids[best], scores[best].astype(np.float32)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = RRF_K) -> list[int]:
+    """Fuse ranked id lists: each id scores the sum of 1 / (k + rank) over the lists.
+
+    Ties keep the order of first appearance, so earlier rankings win them.
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[int(item)] = scores.get(int(item), 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])
@@ -0,0 +1,285 @@
+"""Chunk records stored column-wise in SQLite (`data/vectors/records.sqlite`).
+
+Each record dict (`text`, `type`, `file`, `page`, `source`, `url`, `doc_id`)
+becomes one row keyed by its vector id. The repetitive string columns are
+interned through a `strings` table, so a chunk costs its text plus a few
+integers. The database is memory-mapped and searched by primary key, so a
+query only materialises the rows of its top-k hits. The BM25 postings of
+`lexical_index` are kept in the same database and updated in the same
+transactions.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+import json
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Iterable
+
+import numpy as np
+
+from backend.config import RECORDS_MMAP_BYTES
+from backend.embeddings import lexical_index
+from backend.utils.paths import vectors_dir
+
+_INTERNED = ("type", "file", "source", "url", "doc_id")
+_KNOWN = {"id", "text", "page", *_INTERNED}
+_FILTERABLE = ("file", "url", "type", "doc_id")
+_SQL_BATCH = 500
+
+_local = threading.local()
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """Restricts a search to records whose metadata matches every given field.
+
+    An empty field matches anything; several values for one field match any
+    of them. A plain string is taken as a single value. `page_min` and
+    `page_max` bound the page number (inclusive), which only PDF records have.
+    """
+
+    file: tuple[str, ...] = ()
+    url: tuple[str, ...] = ()
+    type: tuple[str, ...] = ()
+    doc_id: tuple[str, ...] = ()
+    page_min: int | None = None
+    page_max: int | None = None
+
+    def __post_init__(self) -> None:
+        for name in _FILTERABLE:
+            value = getattr(self, name)
+            object.__setattr__(self, name, (value,) if isinstance(value, str) else tuple(value))
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, f.name) not in ((), None) for f in fields(self))
+
+
+def db_path() -> Path:
+    return vectors_dir() / "records.sqlite"
+
+
+def _init(conn: sqlite3.Connection) -> None:
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS strings (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            type INTEGER,
+            file INTEGER,
+            source INTEGER,
+            url INTEGER,
+            doc_id INTEGER,
+            page INTEGER,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS records_doc_id ON records (doc_id);
+        CREATE INDEX IF NOT EXISTS records_file_page ON records (file, page);
+        CREATE INDEX IF NOT EXISTS records_url ON records (url);
+        CREATE INDEX IF NOT EXISTS records_type_page ON records (type, page);
+        """
+    )
+    lexical_index.init(conn)
+
+
+def connect() -> sqlite3.Connection:
+    """Per-thread connection; SQLite connections must not be shared across threads."""
+    path = db_path()
+    conn: sqlite3.Connection | None = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={int(RECORDS_MMAP_BYTES)}")
+    _init(conn)
+    _local.conn = conn
+    _local.path = path
+    _local.strings = {}
+    return conn
+
+
+def _intern(conn: sqlite3.Connection, values: set[str]) -> dict[str, int]:
+    cache: dict[str, int] = _local.strings
+    missing = [v for v in values if v not in cache]
+    if missing:
+        conn.executemany("INSERT OR IGNORE INTO strings (value) VALUES (?)", [(v,) for v in missing])
+        for i in range(0, len(missing), _SQL_BATCH):
+            batch = missing[i : i + _SQL_BATCH]
+            rows = conn.execute(
+                f"SELECT value, id FROM strings WHERE value IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            cache.update(rows)
+    return cache
+
+
+def _string_ids(conn: sqlite3.Connection, values: set[str]) -> list[int]:
+    """Interned ids of those `values` that occur in the store."""
+    out: list[int] = []
+    values_list = list(values)
+    for i in range(0, len(values_list), _SQL_BATCH):
+        batch = values_list[i : i + _SQL_BATCH]
+        rows = conn.execute(
+            f"SELECT id FROM strings WHERE value IN ({','.join('?' * len(batch))})", batch
+        )
+        out.extend(r[0] for r in rows)
+    return out
+
+
+def _string_values(conn: sqlite3.Connection, ids: set[int]) -> dict[int, str]:
+    out: dict[int, str] = {}
+    ids_list = list(ids)
+    for i in range(0, len(ids_list), _SQL_BATCH):
+        batch = ids_list[i : i + _SQL_BATCH]
+        rows = conn.execute(
+            f"SELECT id, value FROM strings WHERE id IN ({','.join('?' * len(batch))})", batch
+        )
+        out.update(rows)
+    return out
+
+
+def _insert(conn: sqlite3.Connection, records: list[dict[str, Any]]) -> None:
+    strings = {r[k] for r in records for k in _INTERNED if r.get(k) is not None}
+    ids = _intern(conn, strings)
+    rows = []
+    for r in records:
+        extra = {k: v for k, v in r.items() if k not in _KNOWN}
+        rows.append(
+            (
+                int(r["id"]),
+                r["text"],
+                *(ids[r[k]] if r.get(k) is not None else None for k in _INTERNED),
+                r.get("page"),
+                json.dumps(extra) if extra else None,
+            )
+        )
+    conn.executemany(
+        "INSERT OR REPLACE INTO records (id, text, type, file, source, url, doc_id, page, extra)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    lexical_index.add(conn, records)
+
+
+def append(records: list[dict[str, Any]], first_id: int) -> None:
+    """Insert records whose ids start at `first_id`.
+
+    Rows at or past `first_id` can only be left over from a writer that
+    crashed before committing `meta.json`; they are dropped first.
+    """
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM records WHERE id >= ?", (first_id,))
+        lexical_index.delete_from(conn, first_id)
+        _insert(conn, records)
+
+
+def replace_all(records: list[dict[str, Any]]) -> None:
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM records")
+        lexical_index.clear(conn)
+        _insert(conn, records)
+
+
+def delete_ids(ids: Iterable[int]) -> None:
+    ids = [int(i) for i in ids]
+    conn = connect()
+    with conn:
+        conn.executemany("DELETE FROM records WHERE id = ?", [(i,) for i in ids])
+        lexical_index.delete_ids(conn, ids)
+
+
+def clear() -> None:
+    # Interned strings are kept: other processes may have their ids cached.
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM records")
+        lexical_index.clear(conn)
+    conn.execute("VACUUM")
+
+
+def fetch(ids: list[int]) -> list[dict[str, Any]]:
+    """Return the records for `ids`, in the same order (unknown ids are skipped)."""
+    if not ids:
+        return []
+    conn = connect()
+    rows: dict[int, tuple] = {}
+    for i in range(0, len(ids), _SQL_BATCH):
+        batch = [int(x) for x in ids[i : i + _SQL_BATCH]]
+        for row in conn.execute(
+            "SELECT id, text, type, file, source, url, doc_id, page, extra FROM records"
+            f" WHERE id IN ({','.join('?' * len(batch))})",
+            batch,
+        ):
+            rows[row[0]] = row
+
+    string_ids = {v for row in rows.values() for v in row[2:7] if v is not None}
+    strings = _string_values(conn, string_ids)
+
+    out: list[dict[str, Any]] = []
+    for record_id in ids:
+        row = rows.get(int(record_id))
+        if row is None:
+            continue
+        record: dict[str, Any] = {"text": row[1]}
+        for key, value in zip(_INTERNED, row[2:7], strict=True):
+            if value is not None:
+                record[key] = strings[value]
+        if row[7] is not None:
+            record["page"] = row[7]
+        if row[8]:
+            record.update(json.loads(row[8]))
+        record["id"] = row[0]
+        out.append(record)
+    return out
+
+
+def ids_for_doc(doc_id: str) -> np.ndarray:
+    conn = connect()
+    rows = conn.execute(
+        "SELECT r.id FROM records r JOIN strings s ON r.doc_id = s.id WHERE s.value = ?",
+        (doc_id,),
+    )
+    return np.array([r[0] for r in rows], dtype=np.int64)
+
+
+def matching_ids(where: SearchFilter) -> np.ndarray:
+    """Sorted ids of the records that `where` accepts.
+
+    Each field is answered from an index on `records`, so the cost follows
+    the number of matches, not the size of the store.
+    """
+    conn = connect()
+    clauses: list[str] = []
+    params: list[Any] = []
+    for name in _FILTERABLE:
+        values = getattr(where, name)
+        if not values:
+            continue
+        ids = _string_ids(conn, set(values))
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        clauses.append(f"{name} IN ({','.join('?' * len(ids))})")
+        params.extend(ids)
+    if where.page_min is not None:
+        clauses.append("page >= ?")
+        params.append(int(where.page_min))
+    if where.page_max is not None:
+        clauses.append("page <= ?")
+        params.append(int(where.page_max))
+
+    sql = "SELECT id FROM records"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    rows = conn.execute(sql + " ORDER BY id", params)
+    return np.fromiter((r[0] for r in rows), dtype=np.int64)
@@ -0,0 +1,349 @@
+"""Append-only on-disk layout for vectors and records.
+
+Files in `data/vectors/`:
+
+- `vectors.f32`     raw float32 rows, only ever appended
+- `ids.i64`         the stable int64 id of each row
+- `records.sqlite`  the chunk records, keyed by id (see `record_store`)
+- `tombstones.i64`  ids of deleted rows, only ever appended
+- `faiss_index.bin` FAISS `IndexIDMap2` over the first `indexed_rows` rows
+- `meta.json`       committed sizes of the files above
+
+Writers append to the data files first and then atomically replace
+`meta.json`; readers never look past the committed sizes, so a crash
+mid-append leaves garbage that the next writer truncates away. Ids are
+never reused, so they stay valid when deleted rows are reclaimed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, replace
+import json
+import os
+from pathlib import Path
+import pickle
+from typing import Any
+import uuid
+
+import faiss
+import numpy as np
+from filelock import FileLock
+
+from backend.embeddings import index_types, record_store
+from backend.utils.paths import vectors_dir
+
+
+def index_path() -> Path:
+    return vectors_dir() / "faiss_index.bin"
+
+
+def vectors_path() -> Path:
+    return vectors_dir() / "vectors.f32"
+
+
+def ids_path() -> Path:
+    return vectors_dir() / "ids.i64"
+
+
+def legacy_records_log_path() -> Path:
+    return vectors_dir() / "records.log"
+
+
+def tombstones_path() -> Path:
+    return vectors_dir() / "tombstones.i64"
+
+
+def meta_path() -> Path:
+    return vectors_dir() / "meta.json"
+
+
+def legacy_records_path() -> Path:
+    return vectors_dir() / "records.pkl"
+
+
+_LOCKS: dict[Path, FileLock] = {}
+
+
+def write_lock() -> FileLock:
+    """Inter-process lock serialising writers of `data/vectors/`.
+
+    One instance per path so nested acquisitions in a thread re-enter instead
+    of deadlocking on a second file descriptor.
+    """
+    vectors_dir().mkdir(parents=True, exist_ok=True)
+    path = vectors_dir() / "write.lock"
+    lock = _LOCKS.get(path)
+    if lock is None:
+        lock = _LOCKS.setdefault(path, FileLock(str(path)))
+    return lock
+
+
+@dataclass(frozen=True)
+class Meta:
+    epoch: str
+    dim: int
+    rows: int
+    index_epoch: int
+    indexed_rows: int
+    index_type: str = "flat"
+    next_id: int = 0
+    tombstones: int = 0
+    # Index type chosen at build time; None follows the configured policy.
+    requested_type: str | None = None
+
+    @property
+    def tail_rows(self) -> int:
+        return self.rows - self.indexed_rows
+
+
+def read_meta() -> Meta | None:
+    try:
+        data = json.loads(meta_path().read_text(encoding="utf-8"))
+        return Meta(
+            epoch=str(data["epoch"]),
+            dim=int(data["dim"]),
+            rows=int(data["rows"]),
+            index_epoch=int(data["index_epoch"]),
+            indexed_rows=int(data["indexed_rows"]),
+            index_type=str(data.get("index_type", "flat")),
+            next_id=int(data.get("next_id", data["rows"])),
+            tombstones=int(data.get("tombstones", 0)),
+            requested_type=data.get("requested_type"),
+        )
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_meta(meta: Meta) -> None:
+    tmp = meta_path().with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(meta)), encoding="utf-8")
+    os.replace(tmp, meta_path())
+
+
+def write_index(index: faiss.Index) -> None:
+    tmp = index_path().with_suffix(".tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, index_path())
+
+
+# Zero-copy mapping of flat code arrays (IndexFlat, HNSW storage); older
+# FAISS builds only know the IVF-list flag.
+_MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def read_index(mmap: bool = False) -> faiss.Index:
+    """Load the persisted index.
+
+    With `mmap` the codes stay in the file's page cache rather than private
+    memory, so the load is near-constant time; such an index is read-only.
+    Index types FAISS cannot map are read normally.
+    """
+    if mmap:
+        try:
+            return faiss.read_index(str(index_path()), _MMAP_FLAGS)
+        except RuntimeError:
+            pass
+    return faiss.read_index(str(index_path()))
+
+
+def new_index(index_type: str, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """Build an id-mapped index of `index_type` over `vectors`."""
+    index = faiss.IndexIDMap2(index_types.build(index_type, vectors, add=False))
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def _read_array(path: Path, dtype, start: int, count: int, mmap: bool = False) -> np.ndarray:
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    if mmap:
+        # Only committed bytes are mapped; appends past them never move them.
+        return np.memmap(
+            path, dtype=dtype, mode="r", offset=start * np.dtype(dtype).itemsize, shape=(count,)
+        )
+    with open(path, "rb") as f:
+        f.seek(start * np.dtype(dtype).itemsize)
+        return np.fromfile(f, dtype=dtype, count=count)
+
+
+def read_vectors(meta: Meta, start: int, stop: int, mmap: bool = False) -> np.ndarray:
+    """Read committed vector rows [start, stop), or map them read-only with `mmap`."""
+    count = max(0, min(stop, meta.rows) - start)
+    data = _read_array(vectors_path(), np.float32, start * meta.dim, count * meta.dim, mmap)
+    return data.reshape(count, meta.dim)
+
+
+def read_rows(meta: Meta, rows: np.ndarray) -> np.ndarray:
+    """Read the committed vectors at the given row positions (a handful at a time)."""
+    out = np.empty((len(rows), meta.dim), dtype=np.float32)
+    with open(vectors_path(), "rb") as f:
+        for i, row in enumerate(rows.tolist()):
+            f.seek(row * meta.dim * 4)
+            out[i] = np.fromfile(f, dtype=np.float32, count=meta.dim)
+    return out
+
+
+def read_ids(meta: Meta, start: int, stop: int, mmap: bool = False) -> np.ndarray:
+    """Read the ids of committed rows [start, stop); ascending by construction."""
+    return _read_array(ids_path(), np.int64, start, min(stop, meta.rows) - start, mmap)
+
+
+def read_tombstones(meta: Meta, start: int = 0) -> np.ndarray:
+    return _read_array(tombstones_path(), np.int64, start, meta.tombstones - start)
+
+
+def _read_legacy_records_log() -> list[dict[str, Any]]:
+    records: list[dict[str, Any]] = []
+    with open(legacy_records_log_path(), "rb") as f:
+        while True:
+            try:
+                records.extend(pickle.load(f))
+            except (EOFError, pickle.UnpicklingError):
+                return records
+
+
+def _with_ids(records: list[dict[str, Any]], ids: np.ndarray) -> list[dict[str, Any]]:
+    return [{**r, "id": i} for r, i in zip(records, ids.tolist(), strict=True)]
+
+
+def create(
+    embeddings: np.ndarray,
+    records: list[dict[str, Any]] | None,
+    index_type: str,
+    ids: np.ndarray | None = None,
+    next_id: int = 0,
+    requested_type: str | None = None,
+) -> tuple[Meta, faiss.Index]:
+    """Replace all persisted vectors with a fresh layout. Caller holds the lock.
+
+    Without `ids` the rows are numbered from `next_id`; reclaiming deleted
+    rows passes the surviving ids so they keep their identity, and passes
+    `records=None` to leave the record store as it is. `requested_type` is
+    remembered so compaction keeps an explicitly chosen index type.
+    """
+    vectors_dir().mkdir(parents=True, exist_ok=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if ids is None:
+        ids = np.arange(next_id, next_id + len(embeddings), dtype=np.int64)
+    if len(ids):
+        next_id = max(next_id, int(ids[-1]) + 1)
+    index = new_index(index_type, embeddings, ids)
+
+    if records is not None:
+        record_store.replace_all(_with_ids(records, ids))
+
+    tmp_vectors = vectors_path().with_suffix(".tmp")
+    embeddings.tofile(tmp_vectors)
+    tmp_ids = ids_path().with_suffix(".tmp")
+    ids.astype(np.int64).tofile(tmp_ids)
+
+    write_index(index)
+    os.replace(tmp_vectors, vectors_path())
+    os.replace(tmp_ids, ids_path())
+    tombstones_path().unlink(missing_ok=True)
+
+    meta = Meta(
+        epoch=uuid.uuid4().hex,
+        dim=int(embeddings.shape[1]),
+        rows=len(embeddings),
+        index_epoch=0,
+        indexed_rows=len(embeddings),
+        index_type=index_types.index_type_of(index),
+        next_id=next_id,
+        tombstones=0,
+        requested_type=requested_type,
+    )
+    write_meta(meta)
+    return meta, index
+
+
+def _append_bytes(path: Path, committed: int, data: bytes) -> None:
+    path.touch(exist_ok=True)
+    with open(path, "r+b") as f:
+        f.truncate(committed)
+        f.seek(0, os.SEEK_END)
+        f.write(data)
+
+
+def append(meta: Meta, embeddings: np.ndarray, records: list[dict[str, Any]]) -> Meta:
+    """Append a batch; cost is proportional to the batch. Caller holds the lock.
+
+    The new rows get ids from `meta.next_id` upwards.
+    """
+    ids = np.arange(meta.next_id, meta.next_id + len(records), dtype=np.int64)
+    record_store.append(_with_ids(records, ids), meta.next_id)
+
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    _append_bytes(vectors_path(), meta.rows * meta.dim * 4, vectors.tobytes())
+    _append_bytes(ids_path(), meta.rows * 8, ids.tobytes())
+
+    new_meta = replace(meta, rows=meta.rows + len(records), next_id=meta.next_id + len(records))
+    write_meta(new_meta)
+    return new_meta
+
+
+def add_tombstones(meta: Meta, ids: np.ndarray) -> Meta:
+    """Mark ids as deleted. Caller holds the lock."""
+    if len(ids) == 0:
+        return meta
+    _append_bytes(tombstones_path(), meta.tombstones * 8, ids.astype(np.int64).tobytes())
+    new_meta = replace(meta, tombstones=meta.tombstones + len(ids))
+    write_meta(new_meta)
+    return new_meta
+
+
+def remove_all() -> None:
+    paths = [
+        meta_path(),
+        index_path(),
+        vectors_path(),
+        ids_path(),
+        tombstones_path(),
+        legacy_records_path(),
+        legacy_records_log_path(),
+    ]
+    for p in paths:
+        try:
+            p.unlink(missing_ok=True)
+        except Exception:
+            # Best-effort cleanup; caller may be exiting.
+            pass
+    if record_store.db_path().exists():
+        record_store.clear()
+
+
+def migrate_legacy() -> None:
+    """Upgrade older layouts in place.
+
+    Handles the original `faiss_index.bin` + `records.pkl` pair and the
+    earlier append-only layouts that kept records in a pickled `records.log`
+    (with or without stable row ids).
+    """
+    meta = read_meta()
+    if meta is not None and not legacy_records_log_path().exists():
+        return
+    if meta is None and not (legacy_records_path().exists() and index_path().exists()):
+        return
+
+    with write_lock():
+        meta = read_meta()
+        if meta is not None:
+            if not legacy_records_log_path().exists():
+                return
+            records = _read_legacy_records_log()[: meta.rows]
+            if ids_path().exists():
+                record_store.replace_all(records)
+            else:
+                create(read_vectors(meta, 0, meta.rows), records, meta.index_type)
+            legacy_records_log_path().unlink(missing_ok=True)
+            return
+
+        if not legacy_records_path().exists():
+            return
+        index = read_index()
+        with open(legacy_records_path(), "rb") as f:
+            records = pickle.load(f)
+        embeddings = index.reconstruct_n(0, index.ntotal)
+        create(np.asarray(embeddings, dtype=np.float32), records, "flat")
+        legacy_records_path().unlink(missing_ok=True)
@@ -1,51 +1,843 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field, replace
+import os
 from pathlib import Path
-import pickle
+import socket
+import threading
+import time
 from typing import Any, Iterable
+import uuid
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-from backend.utils.paths import vectors_dir
+from backend.config import (
+    COMPACT_MIN_ROWS,
+    FILTER_EXACT_ROWS,
+    HYBRID_CANDIDATES,
+    INDEX_MMAP,
+    RECLAIM_TOMBSTONE_RATIO,
+    RESCORE_FACTOR,
+    WRITER_LEASE_SECONDS,
+)
+from backend.embeddings import (
+    doc_registry,
+    embedder,
+    index_types,
+    lexical_index,
+    record_store,
+    vector_log,
+)
+from backend.embeddings.record_store import SearchFilter
+from backend.embeddings.vector_log import Meta
 
-MODEL_NAME = "all-MiniLM-L6-v2"
+# Filters whose matching ids a snapshot keeps, so repeating a filter skips
+# the record store lookup and the selector build.
+_FILTER_CACHE_SIZE = 32
 
-_MODEL: SentenceTransformer | None = None
 
+class VectorStore:
+    """Process-resident view of the append-only vector data.
 
-def _get_model() -> SentenceTransformer:
-    global _MODEL
-    if _MODEL is None:
-        _MODEL = SentenceTransformer(MODEL_NAME)
-    return _MODEL
+    The FAISS index covers rows up to `meta.indexed_rows`; newer rows live in
+    `_tail` and are searched brute force until the next compaction. Deleted
+    ids are excluded from both through an `IDSelector`. Record text and
+    metadata stay on disk in `record_store` and are fetched for the hits
+    only. With `INDEX_MMAP` the index, ids and vectors are memory-mapped
+    rather than copied, so loading is cheap and processes share one page
+    cache. Hits from a compressed index are re-scored against the float32
+    vectors, so distances stay exact whatever the index type.
 
+    Each call re-reads `meta.json` and pulls in only what changed since the
+    last look: new rows, new tombstones, a recompacted index, or (after a
+    rebuild, reclaim or clear) the whole data set.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._meta: Meta | None = None
+        self._index: faiss.Index | None = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._tail = np.empty((0, 0), dtype=np.float32)
+        self._set_tombstones(np.empty(0, dtype=np.int64))
+        self._view: _Snapshot | None = None
+
+    def _set_tombstones(self, tombstones: np.ndarray) -> None:
+        self._tombstones = np.unique(tombstones)
+        if len(self._tombstones):
+            # Keep the inner selector referenced: IDSelectorNot does not own it.
+            self._dead_selector = faiss.IDSelectorBatch(self._tombstones)
+            self._live_selector: faiss.IDSelector | None = faiss.IDSelectorNot(
+                self._dead_selector
+            )
+        else:
+            self._dead_selector = None
+            self._live_selector = None
+
+    def _map_rows(self, meta: Meta) -> None:
+        self._ids = vector_log.read_ids(meta, 0, meta.rows, mmap=True)
+        self._vectors = vector_log.read_vectors(meta, 0, meta.rows, mmap=True)
+        self._tail = self._vectors[meta.indexed_rows :]
+
+    def _load(self, meta: Meta) -> None:
+        self._index = vector_log.read_index(mmap=INDEX_MMAP)
+        if INDEX_MMAP:
+            self._map_rows(meta)
+        else:
+            self._ids = vector_log.read_ids(meta, 0, meta.rows)
+            self._tail = vector_log.read_vectors(meta, meta.indexed_rows, meta.rows)
+        self._set_tombstones(vector_log.read_tombstones(meta))
+        self._meta = meta
+
+    def _catch_up(self, meta: Meta) -> None:
+        old = self._meta
+        assert old is not None
+
+        if INDEX_MMAP:
+            # Re-mapping the committed sizes is as cheap as extending a copy.
+            self._map_rows(meta)
+        elif meta.rows > old.rows:
+            self._ids = np.concatenate([self._ids, vector_log.read_ids(meta, old.rows, meta.rows)])
+            new_rows = vector_log.read_vectors(meta, old.rows, meta.rows)
+            self._tail = np.vstack([self._tail.reshape(-1, meta.dim), new_rows])
+
+        if meta.tombstones > old.tombstones:
+            new_dead = vector_log.read_tombstones(meta, old.tombstones)
+            self._set_tombstones(np.concatenate([self._tombstones, new_dead]))
+
+        if meta.index_epoch != old.index_epoch:
+            self._index = vector_log.read_index(mmap=INDEX_MMAP)
+            if not INDEX_MMAP:
+                # Rows now covered by the index drop out of the tail.
+                self._tail = self._tail[meta.indexed_rows - old.indexed_rows :]
+
+        self._meta = meta
+
+    def _ensure_fresh(self) -> Meta | None:
+        vector_log.migrate_legacy()
+        while True:
+            meta = vector_log.read_meta()
+            if meta is None:
+                self._reset()
+                return None
+
+            try:
+                if self._meta is None or self._meta.epoch != meta.epoch:
+                    self._load(meta)
+                elif self._meta != meta:
+                    self._catch_up(meta)
+            except (OSError, ValueError):
+                # The files were replaced (reclaim, rebuild) after `meta` was read.
+                self._reset()
+                continue
+
+            latest = vector_log.read_meta()
+            if latest is not None and latest.epoch == meta.epoch:
+                return meta
+            self._reset()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        """Number of live (not deleted) chunks."""
+        with self._lock:
+            meta = self._ensure_fresh()
+            return 0 if meta is None else len(self._ids) - len(self._tombstones)
+
+    def _snapshot(self) -> _Snapshot:
+        """The current data, for one search to read without holding the lock.
+
+        Catching up replaces the arrays, index and selectors rather than
+        changing them in place, so a snapshot stays consistent while later
+        calls move the store on. Searches share one snapshot (and its filter
+        cache) until `meta.json` changes.
+        """
+        with self._lock:
+            meta = self._fresh_meta()
+            assert self._index is not None
+            if self._view is None or self._view.meta != meta:
+                self._view = _Snapshot(
+                    meta=meta,
+                    index=self._index,
+                    ids=self._ids,
+                    vectors=self._vectors,
+                    tail=self._tail,
+                    tombstones=self._tombstones,
+                    live_selector=self._live_selector,
+                    dead_selector=self._dead_selector,
+                )
+            return self._view
+
+    def replace(
+        self,
+        embeddings: np.ndarray,
+        records: list[dict[str, Any]],
+        index_type: str | None = None,
+    ) -> None:
+        """Persist a brand-new index built from `embeddings`."""
+        with vector_log.write_lock():
+            vector_log.create(
+                embeddings,
+                records,
+                index_types.choose_index_type(len(records), index_type),
+                requested_type=index_type,
+            )
+            doc_registry.save({})
+        self.invalidate()
+
+    def append(self, embeddings: np.ndarray, records: list[dict[str, Any]]) -> None:
+        """Append a batch without touching previously written data."""
+        with vector_log.write_lock():
+            meta, _ = _append_locked(embeddings, records)
+        _maybe_maintain(meta)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Tombstone every chunk of `doc_id`; return how many were removed."""
+        with vector_log.write_lock():
+            documents = doc_registry.load()
+            previous = documents.pop(doc_id, None)
+            meta = vector_log.read_meta()
+            if previous is None or meta is None:
+                return 0
+
+            dead = _document_ids(previous)
+            meta = vector_log.add_tombstones(meta, dead)
+            doc_registry.save(documents)
+
+        _maybe_maintain(meta)
+        return len(dead)
+
+    def _fresh_meta(self) -> Meta:
+        meta = self._ensure_fresh()
+        if meta is None:
+            raise FileNotFoundError(
+                "FAISS index not found. Ingest data and build vectors first."
+            )
+        return meta
+
+    def search_vectors(
+        self,
+        q_emb: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        rescore: bool = True,
+        where: SearchFilter | None = None,
+    ) -> tuple[list[dict[str, Any]], list[float]]:
+        return self.search_vectors_many(
+            q_emb, top_k, nprobe=nprobe, ef_search=ef_search, rescore=rescore, where=where
+        )[0]
+
+    def search_vectors_many(
+        self,
+        q_embs: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        rescore: bool = True,
+        where: SearchFilter | None = None,
+    ) -> list[tuple[list[dict[str, Any]], list[float]]]:
+        """(records, distances) for each query row, from one batched index search."""
+        view = self._snapshot()
+        nearest = view.nearest(
+            q_embs,
+            top_k,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            rescore=rescore,
+            allowed=view.filtered(where),
+        )
+        return _with_records(
+            [[i for _, i in c] for c in nearest], [{i: d for d, i in c} for c in nearest]
+        )
+
+    def search_hybrid(
+        self,
+        q_emb: np.ndarray,
+        query: str,
+        top_k: int,
+        candidates: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        rescore: bool = True,
+        where: SearchFilter | None = None,
+    ) -> tuple[list[dict[str, Any]], list[float]]:
+        """Fuse the dense and BM25 rankings by reciprocal rank fusion.
+
+        Distances are exact L2 distances to the query for every hit, including
+        those only the keyword ranking found, so they stay comparable with
+        `search_vectors`.
+        """
+        return self.search_hybrid_many(
+            q_emb,
+            [query],
+            top_k,
+            candidates=candidates,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            rescore=rescore,
+            where=where,
+        )[0]
+
+    def search_hybrid_many(
+        self,
+        q_embs: np.ndarray,
+        queries: list[str],
+        top_k: int,
+        candidates: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        rescore: bool = True,
+        where: SearchFilter | None = None,
+    ) -> list[tuple[list[dict[str, Any]], list[float]]]:
+        """`search_hybrid` for each query; the dense side is one batched index search."""
+        depth = max(top_k, candidates or HYBRID_CANDIDATES)
+        rankings: list[list[int]] = []
+        distances: list[dict[int, float]] = []
+        view = self._snapshot()
+        allowed = view.filtered(where)
+        nearest = view.nearest(
+            q_embs,
+            depth,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            rescore=rescore,
+            allowed=allowed,
+        )
+        for q, query, dense in zip(q_embs, queries, nearest, strict=True):
+            lexical_ids, _ = view.lexical(query, depth, allowed)
+            fused = lexical_index.reciprocal_rank_fusion(
+                [[i for _, i in dense], lexical_ids.tolist()]
+            )[:top_k]
+            known = {i: d for d, i in dense}
+            missing = np.array([i for i in fused if i not in known], dtype=np.int64)
+            if len(missing):
+                exact = ((view.exact_vectors(missing) - q) ** 2).sum(axis=1)
+                known.update(zip(missing.tolist(), exact.tolist(), strict=True))
+            rankings.append(fused)
+            distances.append(known)
+
+        return _with_records(rankings, distances)
+
+
+@dataclass(frozen=True)
+class _Filtered:
+    """The live ids a filter accepts in one snapshot, ready to search."""
+
+    ids: np.ndarray
+    # Only built when there are too many ids to score exactly.
+    selector: faiss.IDSelector | None
+    # Mask of the snapshot's tail rows the filter rejects.
+    tail_dead: np.ndarray
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """One consistent state of a `VectorStore`, searched without its lock."""
+
+    meta: Meta
+    index: faiss.Index
+    ids: np.ndarray
+    vectors: np.ndarray
+    tail: np.ndarray
+    tombstones: np.ndarray
+    live_selector: faiss.IDSelector | None
+    # Referenced so the selector wrapped by `live_selector` outlives it.
+    dead_selector: faiss.IDSelector | None
+    filters: dict[SearchFilter, _Filtered] = field(default_factory=dict)
+    filters_lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def exact_vectors(self, ids: np.ndarray) -> np.ndarray:
+        rows = np.searchsorted(self.ids, ids)
+        if INDEX_MMAP:
+            return np.asarray(self.vectors[rows])
+        return vector_log.read_rows(self.meta, rows)
+
+    def filtered(self, where: SearchFilter | None) -> _Filtered | None:
+        """What `where` accepts, or None for no filter.
+
+        The result only depends on the filter and on this snapshot's data, so
+        it is cached: a repeated filter costs nothing to set up.
+        """
+        if not where:
+            return None
+        with self.filters_lock:
+            cached = self.filters.get(where)
+        if cached is not None:
+            return cached
+
+        ids = record_store.matching_ids(where)
+        ids = ids[self.live(ids)]
+        filtered = _Filtered(
+            ids=ids,
+            selector=faiss.IDSelectorBatch(ids) if len(ids) > FILTER_EXACT_ROWS else None,
+            tail_dead=~np.isin(self.ids[self.meta.indexed_rows :], ids),
+        )
+        with self.filters_lock:
+            if len(self.filters) >= _FILTER_CACHE_SIZE:
+                del self.filters[next(iter(self.filters))]
+            self.filters[where] = filtered
+        return filtered
+
+    def live(self, ids: np.ndarray) -> np.ndarray:
+        """Mask of `ids` that are rows of this snapshot and not deleted.
+
+        Records of an append not yet committed to `meta.json`, or of rows a
+        reclaim has already dropped, may still be on disk; they are not live.
+        """
+        rows = np.searchsorted(self.ids, ids)
+        present = rows < len(self.ids)
+        present[present] = self.ids[rows[present]] == ids[present]
+        return present & ~np.isin(ids, self.tombstones)
+
+    def nearest(
+        self,
+        q_embs: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        rescore: bool = True,
+        allowed: _Filtered | None = None,
+    ) -> list[list[tuple[float, int]]]:
+        """For each query row, (distance, id) of the `top_k` nearest live rows, nearest first.
+
+        All queries go to the index in one `search` call. `allowed` restricts
+        the search to the ids a filter accepts. Up to `FILTER_EXACT_ROWS` of
+        them are scored exactly from their stored vectors, so a narrow filter
+        costs less than an unfiltered search; larger sets are pushed into the
+        index through the filter's `IDSelector`.
+        """
+        if allowed is not None and allowed.selector is None:
+            vectors = self.exact_vectors(allowed.ids)
+            return [_top_k(((vectors - q) ** 2).sum(axis=1), allowed.ids, top_k) for q in q_embs]
+
+        selector = self.live_selector if allowed is None else allowed.selector
+        params = index_types.search_params(
+            self.index, nprobe=nprobe, ef_search=ef_search, sel=selector
+        )
+        rescore = (
+            rescore
+            and RESCORE_FACTOR > 1
+            and index_types.index_type_of(self.index) in index_types.LOSSY_TYPES
+        )
+        fetch_k = top_k * RESCORE_FACTOR if rescore else top_k
+        all_distances, all_ids = self.index.search(q_embs, fetch_k, params=params)
+
+        if len(self.tail):
+            tail_ids = self.ids[self.meta.indexed_rows :]
+            if allowed is None:
+                tail_dead = np.isin(tail_ids, self.tombstones)
+            else:
+                tail_dead = allowed.tail_dead
+
+        results = []
+        for q, distances, ids in zip(q_embs, all_distances, all_ids, strict=True):
+            found = ids >= 0
+            distances, ids = distances[found], ids[found]
+            if rescore and len(ids):
+                distances, ids = index_types.rescore(q, ids, self.exact_vectors(ids), top_k)
+            candidates = list(zip(distances.tolist(), ids.tolist(), strict=True))
+            if len(self.tail):
+                tail_dist = ((self.tail - q) ** 2).sum(axis=1)
+                tail_dist[tail_dead] = np.inf
+                candidates.extend(_top_k(tail_dist, tail_ids, top_k))
+            candidates.sort()
+            results.append(candidates[:top_k])
+        return results
+
+    def lexical(
+        self, query: str, top_k: int, allowed: _Filtered | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        def keep(ids: np.ndarray) -> np.ndarray:
+            return np.isin(ids, allowed.ids) if allowed is not None else self.live(ids)
+
+        return lexical_index.search(record_store.connect(), query, top_k, keep)
+
+
+def _with_records(
+    rankings: list[list[int]], distances: list[dict[int, float]]
+) -> list[tuple[list[dict[str, Any]], list[float]]]:
+    """(records, distances) per ranking, with all records fetched in one call."""
+    records = {r["id"]: r for r in record_store.fetch(sorted({i for ids in rankings for i in ids}))}
+    out = []
+    for ids, dist in zip(rankings, distances, strict=True):
+        # Each query gets its own dicts: callers annotate them (e.g. "also_in").
+        hits = [dict(records[i]) for i in ids if i in records]
+        out.append((hits, [dist[h["id"]] for h in hits]))
+    return out
+
+
+def _top_k(distances: np.ndarray, ids: np.ndarray, k: int) -> list[tuple[float, int]]:
+    """The `k` smallest finite (distance, id) pairs, nearest first."""
+    k = min(k, len(distances))
+    if k == 0:
+        return []
+    best = np.argpartition(distances, k - 1)[:k]
+    return sorted(
+        (float(distances[i]), int(ids[i])) for i in best if np.isfinite(distances[i])
+    )
+
+
+_STORE: VectorStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> VectorStore:
+    """Return the process-wide resident store."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = VectorStore()
+    return _STORE
+
+
+def _append_locked(
+    embeddings: np.ndarray, records: list[dict[str, Any]]
+) -> tuple[Meta, tuple[int, int]]:
+    """Append under the write lock; return the new meta and the ids assigned."""
+    vector_log.migrate_legacy()
+    meta = vector_log.read_meta()
+    if meta is None:
+        meta, _ = vector_log.create(
+            embeddings, records, index_types.choose_index_type(len(records))
+        )
+        return meta, (0, meta.next_id)
+    new_meta = vector_log.append(meta, embeddings, records)
+    return new_meta, (meta.next_id, new_meta.next_id)
+
+
+def _range_ids(ranges: tuple[tuple[int, int], ...]) -> np.ndarray:
+    if not ranges:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([np.arange(a, b, dtype=np.int64) for a, b in ranges])
+
+
+def _committed_ids(doc: doc_registry.Document) -> np.ndarray:
+    if doc.id_ranges or not doc.chunks:
+        return _range_ids(doc.id_ranges)
+    # Registry entries written before id ranges were tracked.
+    return np.setdiff1d(record_store.ids_for_doc(doc.doc_id), _range_ids(doc.pending_ranges))
+
+
+def _document_ids(doc: doc_registry.Document) -> np.ndarray:
+    """Ids of every chunk of `doc`, including those of an unfinished new version."""
+    return np.concatenate([_committed_ids(doc), _range_ids(doc.pending_ranges)])
+
+
+class DocumentBusyError(RuntimeError):
+    """Another writer is streaming a new version of the same document."""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # e.g. PermissionError: it exists, but is not ours
+        return True
+    return True
+
+
+def _lease_held(entry: doc_registry.Document) -> bool:
+    """Whether `entry` is leased to a writer that may still be running."""
+    if not entry.writer or entry.lease_expires <= time.time():
+        return False
+    host, pid, _ = entry.writer.split(":", 2)
+    # A writer on this machine whose process is gone crashed; no need to wait it out.
+    return host != socket.gethostname() or _pid_alive(int(pid))
+
+
+class DocumentWriter:
+    """Streams a new version of one document into the store, batch by batch.
+
+    `begin` leases the document to this writer, so a second writer for it is
+    refused with `DocumentBusyError` until this one commits or aborts. Each
+    `write` is appended (and searchable) at once and noted in the registry as
+    pending; `commit` then makes exactly the ranges this writer appended the
+    document's content and retires the previous version, and `abort` removes
+    them. A crash in between leaves pending chunks and a lease that runs out;
+    the next writer for the document then removes them.
+    """
+
+    def __init__(self, doc_id: str, content_hash: str) -> None:
+        self.doc_id = doc_id
+        self.content_hash = content_hash
+        self.chunks = 0
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        # Id ranges appended by this writer.
+        self.ranges: tuple[tuple[int, int], ...] = ()
+
+    def _tombstone(self, ids: np.ndarray) -> Meta | None:
+        meta = vector_log.read_meta()
+        if meta is not None and len(ids):
+            meta = vector_log.add_tombstones(meta, ids)
+        return meta
+
+    def _leased(self, entry: doc_registry.Document) -> doc_registry.Document:
+        return replace(
+            entry, writer=self.token, lease_expires=time.time() + WRITER_LEASE_SECONDS
+        )
+
+    def _check_lease(self, documents: dict[str, doc_registry.Document]) -> doc_registry.Document:
+        entry = documents.get(self.doc_id)
+        if entry is None or entry.writer != self.token:
+            # Expired and taken over, or the document was deleted meanwhile.
+            raise DocumentBusyError(f"{self.doc_id}: lease lost, ingest abandoned")
+        return entry
+
+    def begin(self) -> bool:
+        """Lease the document; return False (without a lease) if this content is stored.
+
+        Raises `DocumentBusyError` while another writer holds the document.
+        """
+        with vector_log.write_lock():
+            documents = doc_registry.load()
+            previous = documents.get(self.doc_id)
+            if previous is not None and _lease_held(previous):
+                raise DocumentBusyError(f"{self.doc_id} is being ingested by another writer")
+            if previous is not None and (previous.pending_ranges or previous.writer):
+                # Left over from an ingest that never finished.
+                self._tombstone(_range_ids(previous.pending_ranges))
+                previous = replace(previous, pending_ranges=(), writer="", lease_expires=0.0)
+                if previous.content_hash:
+                    documents[self.doc_id] = previous
+                else:
+                    del documents[self.doc_id]
+                    previous = None
+                doc_registry.save(documents)
+            if previous is not None and previous.content_hash == self.content_hash:
+                return False
+            documents[self.doc_id] = self._leased(
+                previous or doc_registry.Document(doc_id=self.doc_id, content_hash="", chunks=0)
+            )
+            doc_registry.save(documents)
+            return True
+
+    def write(self, embeddings: np.ndarray, records: list[dict[str, Any]]) -> None:
+        write_batch([(self, embeddings, records)])
+
+    def commit(self) -> int:
+        """Make the written chunks the document's content; return how many there are."""
+        commit_batch([self])
+        return self.chunks
+
+    def abort(self) -> None:
+        """Remove the chunks written so far and release the lease; the previous version stays."""
+        with vector_log.write_lock():
+            documents = doc_registry.load()
+            entry = documents.get(self.doc_id)
+            if entry is None or entry.writer != self.token:
+                # Whoever took the document over already removed our chunks.
+                return
+            self._tombstone(_range_ids(self.ranges))
+            if entry.content_hash:
+                documents[self.doc_id] = replace(
+                    entry, pending_ranges=(), writer="", lease_expires=0.0
+                )
+            else:
+                del documents[self.doc_id]
+            doc_registry.save(documents)
+
+
+def write_batch(parts: list[tuple[DocumentWriter, np.ndarray, list[dict[str, Any]]]]) -> None:
+    """Append chunks for several documents in one append and one registry update.
+
+    Raises `DocumentBusyError`, before appending anything, if a writer has
+    lost its lease.
+    """
+    parts = [p for p in parts if p[2]]
+    if not parts:
+        return
+    embeddings = np.concatenate([e for _, e, _ in parts])
+    records = [r for _, _, batch in parts for r in batch]
+    with vector_log.write_lock():
+        documents = doc_registry.load()
+        for writer, _, _ in parts:
+            writer._check_lease(documents)
+        meta, (start, _) = _append_locked(embeddings, records)
+        for writer, _, batch in parts:
+            entry = documents[writer.doc_id]
+            id_range = (start, start + len(batch))
+            documents[writer.doc_id] = writer._leased(
+                replace(entry, pending_ranges=doc_registry.add_range(entry.pending_ranges, id_range))
+            )
+            writer.ranges = doc_registry.add_range(writer.ranges, id_range)
+            writer.chunks += len(batch)
+            start += len(batch)
+        doc_registry.save(documents)
+    _maybe_maintain(meta)
+
+
+def commit_batch(writers: list[DocumentWriter]) -> None:
+    """Commit several documents with one tombstone append and one registry update.
+
+    Raises `DocumentBusyError`, before committing any, if a writer has lost
+    its lease.
+    """
+    if not writers:
+        return
+    with vector_log.write_lock():
+        documents = doc_registry.load()
+        previous = [writer._check_lease(documents) for writer in writers]
+        dead = [_committed_ids(entry) for entry in previous]
+        for writer in writers:
+            documents[writer.doc_id] = doc_registry.Document(
+                doc_id=writer.doc_id,
+                content_hash=writer.content_hash,
+                chunks=writer.chunks,
+                id_ranges=writer.ranges,
+            )
+        meta = vector_log.read_meta()
+        if meta is not None:
+            meta = vector_log.add_tombstones(meta, np.concatenate(dead))
+        doc_registry.save(documents)
+    if meta is not None:
+        _maybe_maintain(meta)
+
+
+def compact(index_type: str | None = None) -> None:
+    """Fold appended rows into the persisted FAISS index.
+
+    When the wanted index type differs from the current one (the `auto` policy
+    crossing `ANN_MIN_ROWS`, or an explicit `index_type`), the index is rebuilt
+    and trained from all live vectors instead of extended. A type that needs
+    more rows to train than there are counts as flat, like in
+    `index_types.build`, so a small store is not rebuilt on every pass.
+
+    The index is built and written outside the write lock (appended data
+    never changes), then published by bumping `index_epoch` in `meta.json`.
+    """
+    meta = vector_log.read_meta()
+    if meta is None:
+        return
+
+    live_rows = meta.rows - meta.tombstones
+    wanted = index_types.buildable_type(
+        index_type or index_types.choose_index_type(live_rows, meta.requested_type), live_rows
+    )
+    if wanted != meta.index_type:
+        ids = vector_log.read_ids(meta, 0, meta.rows)
+        live = ~np.isin(ids, vector_log.read_tombstones(meta))
+        vectors = vector_log.read_vectors(meta, 0, meta.rows)
+        index = vector_log.new_index(wanted, vectors[live], ids[live])
+    else:
+        if meta.tail_rows == 0 and (index_type is None or index_type == meta.requested_type):
+            return
+        index = vector_log.read_index()
+        index.add_with_ids(
+            vector_log.read_vectors(meta, meta.indexed_rows, meta.rows),
+            vector_log.read_ids(meta, meta.indexed_rows, meta.rows),
+        )
+
+    with vector_log.write_lock():
+        current = vector_log.read_meta()
+        if current is None or current.epoch != meta.epoch:
+            return
+        if current.index_epoch != meta.index_epoch:
+            return
+        vector_log.write_index(index)
+        vector_log.write_meta(
+            replace(
+                current,
+                index_epoch=current.index_epoch + 1,
+                indexed_rows=meta.rows,
+                index_type=index_types.index_type_of(index),
+                requested_type=index_type or current.requested_type,
+            )
+        )
+
+
+def reclaim() -> None:
+    """Rewrite the stored data without tombstoned rows.
+
+    Surviving rows keep their ids. Runs under the write lock, so ingestion
+    waits for it; searches keep using the previous data until it finishes.
+    """
+    with vector_log.write_lock():
+        meta = vector_log.read_meta()
+        if meta is None or meta.tombstones == 0:
+            return
+
+        ids = vector_log.read_ids(meta, 0, meta.rows)
+        dead = vector_log.read_tombstones(meta)
+        live = ~np.isin(ids, dead)
+        vectors = vector_log.read_vectors(meta, 0, meta.rows)[live]
+        # Records go first: until the new meta is published the dead ids are
+        # still tombstoned, so no search can ask for them.
+        record_store.delete_ids(np.unique(dead).tolist())
+        vector_log.create(
+            vectors,
+            None,
+            index_types.choose_index_type(len(vectors), meta.requested_type),
+            ids=ids[live],
+            next_id=meta.next_id,
+            requested_type=meta.requested_type,
+        )
+
+
+_MAINTENANCE = threading.Lock()
+
+
+def _needs_reclaim(meta: Meta) -> bool:
+    return meta.tombstones > 0 and meta.tombstones >= RECLAIM_TOMBSTONE_RATIO * meta.rows
+
+
+def _needs_compaction(meta: Meta) -> bool:
+    return meta.tail_rows >= COMPACT_MIN_ROWS
+
+
+def _maybe_maintain(meta: Meta) -> None:
+    if _needs_reclaim(meta) or _needs_compaction(meta):
+        compact_in_background()
 
-def _index_path() -> Path:
-    return vectors_dir() / "faiss_index.bin"
 
+def compact_in_background() -> None:
+    """Reclaim deleted rows and fold the tail into the index, off the caller's thread."""
+    if not _MAINTENANCE.acquire(blocking=False):
+        return
+
+    def _run() -> None:
+        try:
+            # Writes that arrive while a pass runs are picked up by the next one.
+            while True:
+                meta = vector_log.read_meta()
+                if meta is not None and _needs_reclaim(meta):
+                    reclaim()
+                elif meta is not None and _needs_compaction(meta):
+                    compact()
+                else:
+                    return
+                if vector_log.read_meta() == meta:
+                    return
+        finally:
+            _MAINTENANCE.release()
 
-def _records_path() -> Path:
-    return vectors_dir() / "records.pkl"
+    threading.Thread(target=_run, name="vector-compaction", daemon=True).start()
 
 
-def _ensure_vectors_dir() -> None:
-    vectors_dir().mkdir(parents=True, exist_ok=True)
+def _encode(texts: Iterable[str]) -> np.ndarray:
+    return embedder.encode_cached(list(texts), show_progress_bar=True)
 
 
 def has_index() -> bool:
-    return _index_path().exists() and _records_path().exists()
+    if vector_log.meta_path().exists():
+        return True
+    return vector_log.index_path().exists() and vector_log.legacy_records_path().exists()
 
 
 def clear_index() -> None:
     """Delete persisted vector data so the next run starts fresh."""
-    for p in (_index_path(), _records_path()):
-        try:
-            p.unlink(missing_ok=True)
-        except Exception:
-            # Best-effort cleanup; caller may be exiting.
-            pass
+    with vector_log.write_lock():
+        vector_log.remove_all()
+        doc_registry.registry_path().unlink(missing_ok=True)
 
     # Backward-compat cleanup (older versions wrote these in repo root).
     legacy_files = [Path("faiss_index.bin"), Path("chunks.pkl")]
@@ -55,72 +847,183 @@ def clear_index() -> None:
         except Exception:
             pass
 
+    get_store().invalidate()
+
 
-def build_index(records: list[dict[str, Any]]) -> None:
+def build_index(records: list[dict[str, Any]], index_type: str | None = None) -> None:
     """Create a fresh FAISS index from records.
 
     Each record must contain at least: {"text": str, "source": str}.
+    `index_type` (one of `index_types.INDEX_TYPES`, e.g. "sq8" or "pq" to
+    store compressed codes) overrides the configured type and is kept for the
+    life of the index.
     """
-    _ensure_vectors_dir()
-
-    texts = [r["text"] for r in records]
-    model = _get_model()
-    embeddings = model.encode(texts, show_progress_bar=True)
-
-    dim = int(embeddings.shape[1])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.asarray(embeddings, dtype=np.float32))
-
-    faiss.write_index(index, str(_index_path()))
-    with open(_records_path(), "wb") as f:
-        pickle.dump(records, f)
+    embeddings = _encode(r["text"] for r in records)
+    get_store().replace(embeddings, records, index_type)
 
 
 def add_records(records: list[dict[str, Any]]) -> None:
-    """Append records to existing index; creates index if missing."""
+    """Append records to existing data; creates the index if missing."""
     if not records:
         return
 
+    embeddings = _encode(r["text"] for r in records)
+    get_store().append(embeddings, records)
+
+
+def document_status(doc_id: str, content_hash: str) -> str:
+    """Return "new", "unchanged" or "changed" for a document about to be ingested."""
+    previous = doc_registry.load().get(doc_id)
+    if previous is None:
+        return "new"
+    return "unchanged" if previous.content_hash == content_hash else "changed"
+
+
+def list_documents() -> list[doc_registry.Document]:
+    # Entries without a hash are first versions still being written.
+    documents = [d for d in doc_registry.load().values() if d.content_hash]
+    return sorted(documents, key=lambda d: d.doc_id)
+
+
+def upsert_document_batches(
+    doc_id: str, content_hash: str, batches: Iterable[list[dict[str, Any]]]
+) -> int | None:
+    """Stream batches of records in as the new version of `doc_id`.
+
+    Each batch is embedded and appended before the next is pulled, so memory
+    is bounded by the batch size, not the document. Returns the number of
+    chunks stored, or None if this content is already stored. If the
+    iteration fails, the chunks written so far are removed again.
+    """
+    writer = DocumentWriter(doc_id, content_hash)
+    if not writer.begin():
+        return None
+    try:
+        for batch in batches:
+            batch = [{**r, "doc_id": doc_id} for r in batch]
+            writer.write(embedder.encode_cached([r["text"] for r in batch]), batch)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def delete_document(doc_id: str) -> int:
+    """Remove one document's chunks from search; return how many were removed."""
+    return get_store().delete_document(doc_id)
+
+
+def search(
+    query: str,
+    top_k: int = 5,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    rescore: bool = True,
+    where: SearchFilter | None = None,
+) -> tuple[list[dict[str, Any]], list[float]]:
+    """Return (records, distances).
+
+    `nprobe` / `ef_search` override the configured IVF / HNSW search effort
+    for this query; they are ignored by a flat index. `rescore=False` returns
+    a compressed index's approximate ranking without the exact re-scoring.
+    `where` restricts the search to matching records, e.g.
+    `SearchFilter(file="guide.pdf", page_max=10)` or `SearchFilter(type="web")`.
+    """
     if not has_index():
-        build_index(records)
-        return
+        raise FileNotFoundError(
+            "FAISS index not found. Ingest data and build vectors first."
+        )
 
-    index = faiss.read_index(str(_index_path()))
-    with open(_records_path(), "rb") as f:
-        existing_records: list[dict[str, Any]] = pickle.load(f)
+    q_emb = embedder.encode_query(query)
+    return get_store().search_vectors(
+        q_emb, top_k, nprobe=nprobe, ef_search=ef_search, rescore=rescore, where=where
+    )
 
-    texts = [r["text"] for r in records]
-    model = _get_model()
-    embeddings = model.encode(texts, show_progress_bar=True)
-    index.add(np.asarray(embeddings, dtype=np.float32))
-    existing_records.extend(records)
 
-    faiss.write_index(index, str(_index_path()))
-    with open(_records_path(), "wb") as f:
-        pickle.dump(existing_records, f)
+def hybrid_search(
+    query: str,
+    top_k: int = 5,
+    candidates: int | None = None,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    rescore: bool = True,
+    where: SearchFilter | None = None,
+) -> tuple[list[dict[str, Any]], list[float]]:
+    """Like `search`, but fusing dense hits with BM25 keyword hits.
 
+    Each ranking contributes `candidates` hits (default
+    `RAG_HYBRID_CANDIDATES`) to the fusion; the distances returned are the
+    hits' exact L2 distances to the query.
+    """
+    if not has_index():
+        raise FileNotFoundError(
+            "FAISS index not found. Ingest data and build vectors first."
+        )
+
+    q_emb = embedder.encode_query(query)
+    return get_store().search_hybrid(
+        q_emb,
+        query,
+        top_k,
+        candidates=candidates,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        rescore=rescore,
+        where=where,
+    )
+
+
+def search_many(
+    queries: list[str],
+    top_k: int = 5,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    rescore: bool = True,
+    where: SearchFilter | None = None,
+) -> list[tuple[list[dict[str, Any]], list[float]]]:
+    """`search` for each query, in input order.
 
-def search(query: str, top_k: int = 5) -> tuple[list[dict[str, Any]], list[float]]:
-    """Return (records, distances)."""
+    The queries are embedded in one `encode` batch and searched with one
+    batched index search, which is much cheaper than one call per query.
+    """
+    if not queries:
+        return []
     if not has_index():
         raise FileNotFoundError(
             "FAISS index not found. Ingest data and build vectors first."
         )
 
-    model = _get_model()
-    index = faiss.read_index(str(_index_path()))
-    with open(_records_path(), "rb") as f:
-        records: list[dict[str, Any]] = pickle.load(f)
+    q_embs = embedder.encode_queries(list(queries))
+    return get_store().search_vectors_many(
+        q_embs, top_k, nprobe=nprobe, ef_search=ef_search, rescore=rescore, where=where
+    )
 
-    q_emb = model.encode([query])
-    distances, indices = index.search(np.asarray(q_emb, dtype=np.float32), top_k)
 
-    hits: list[dict[str, Any]] = []
-    hit_distances: list[float] = []
-    for dist, idx in zip(distances[0].tolist(), indices[0].tolist(), strict=False):
-        if idx < 0:
-            continue
-        hits.append(records[idx])
-        hit_distances.append(float(dist))
+def hybrid_search_many(
+    queries: list[str],
+    top_k: int = 5,
+    candidates: int | None = None,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    rescore: bool = True,
+    where: SearchFilter | None = None,
+) -> list[tuple[list[dict[str, Any]], list[float]]]:
+    """`hybrid_search` for each query, embedded and densely searched as one batch."""
+    if not queries:
+        return []
+    if not has_index():
+        raise FileNotFoundError(
+            "FAISS index not found. Ingest data and build vectors first."
+        )
 
-    return hits, hit_distances
+    q_embs = embedder.encode_queries(list(queries))
+    return get_store().search_hybrid_many(
+        q_embs,
+        list(queries),
+        top_k,
+        candidates=candidates,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        rescore=rescore,
+        where=where,
+    )
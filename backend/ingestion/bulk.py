@@ -0,0 +1,354 @@
+"""Non-interactive bulk ingestion of a PDF directory and/or a URL manifest.
+
+    python -m backend.ingestion.bulk                     # every PDF in data/raw/raw_pdfs
+    python -m backend.ingestion.bulk --pdf-dir manuals --urls urls.txt
+    python -m backend.ingestion.bulk --crawl https://kubernetes.io/docs/ --max-pages 200
+
+PDFs are extracted on the process pool and URLs fetched (or sites crawled)
+concurrently while the main thread chunks, embeds (large batches across documents, one
+model instance) and appends. Unchanged documents are skipped before any work
+is done, and a document only counts as ingested once all its chunks are
+stored, so re-running after a crash resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from backend.config import WEB_CONCURRENCY
+from backend.embeddings import doc_registry, embedder
+from backend.embeddings.doc_registry import content_hash, pdf_doc_id, web_doc_id
+from backend.ingestion import pipeline
+from backend.ingestion.crawler import CrawlOptions, CrawlStats, crawl
+from backend.ingestion.pdf_loader import file_hash, iter_pdf_files
+from backend.ingestion.text_cleaner import normalize_text
+from backend.ingestion.web_cache_loader import WebText, get_web_texts
+from backend.processing.near_dup import DedupStats, drop_near_duplicates
+from backend.utils.logger import get_logger
+from backend.utils.paths import raw_pdfs_dir, raw_text_dir
+
+# `vector_store` (and so FAISS) is imported where it is used: the PDF
+# extraction workers re-import this module when it runs as the CLI.
+if TYPE_CHECKING:
+    from backend.embeddings.vector_store import DocumentWriter
+
+DEFAULT_BATCH_CHUNKS = 1024
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageStats:
+    docs: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class BulkSummary:
+    ingested: int = 0
+    unchanged: int = 0
+    empty: int = 0
+    duplicates: int = 0
+    near_duplicates: DedupStats = field(default_factory=DedupStats)
+    failed: dict[str, str] = field(default_factory=dict)
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def stage(self, name: str) -> StageStats:
+        return self.stages.setdefault(name, StageStats())
+
+    def format(self) -> str:
+        lines = [
+            f"ingested {self.ingested}, unchanged {self.unchanged}, empty {self.empty},"
+            f" duplicates {self.duplicates}, failed {len(self.failed)} in {self.seconds:.1f}s",
+            f"near-duplicate chunks skipped: {self.near_duplicates.duplicates}"
+            f" of {self.near_duplicates.chunks} ({self.near_duplicates.ratio:.1%})",
+            f"{'stage':<10}{'docs':>8}{'chunks':>10}{'seconds':>10}{'docs/s':>10}{'chunks/s':>10}",
+        ]
+        for name, s in self.stages.items():
+            docs_rate = s.docs / s.seconds if s.seconds > 0 else 0.0
+            chunk_rate = s.chunks / s.seconds if s.seconds > 0 else 0.0
+            lines.append(
+                f"{name:<10}{s.docs:>8}{s.chunks:>10}{s.seconds:>10.2f}"
+                f"{docs_rate:>10.1f}{chunk_rate:>10.1f}"
+            )
+        for source, error in self.failed.items():
+            lines.append(f"failed: {source}: {error}")
+        return "\n".join(lines)
+
+
+def _timed(items: Iterable[T], stats: StageStats) -> Iterator[T]:
+    """Yield from `items`, charging the time spent waiting for each to `stats`."""
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            stats.seconds += time.perf_counter() - start
+        yield item
+
+
+class _Batcher:
+    """Embeds the chunks of many documents in large shared batches.
+
+    A document is committed once all of its chunks have been stored; until
+    then its chunks are pending, so an interrupted run leaves nothing behind
+    that the next run does not clean up. Each document is written at most
+    once per run: a URL that is both listed and crawled, or reached by two
+    crawls, is counted as a duplicate the second time.
+    """
+
+    def __init__(self, batch_chunks: int, summary: BulkSummary) -> None:
+        self.batch_chunks = batch_chunks
+        self.summary = summary
+        self._buffer: list[tuple[DocumentWriter, dict[str, Any]]] = []
+        self._complete: list[DocumentWriter] = []
+        self._open: list[DocumentWriter] = []
+        self._seen: set[str] = set()
+
+    def add(self, doc_id: str, doc_hash: str, records: Iterable[dict[str, Any]]) -> None:
+        from backend.embeddings.vector_store import DocumentBusyError, DocumentWriter
+
+        if doc_id in self._seen:
+            # A second writer would be refused: the first one holds the
+            # document until the shared batch is flushed.
+            self.summary.duplicates += 1
+            return
+        self._seen.add(doc_id)
+        writer = DocumentWriter(doc_id, doc_hash)
+        try:
+            if not writer.begin():
+                self.summary.unchanged += 1
+                return
+        except DocumentBusyError as e:
+            self.summary.failed[doc_id] = str(e)
+            return
+
+        self._open.append(writer)
+        chunk = self.summary.stage("chunk")
+        added = 0
+        records = drop_near_duplicates(records, self.summary.near_duplicates)
+        for record in _timed(records, chunk):
+            self._buffer.append((writer, {**record, "doc_id": doc_id}))
+            added += 1
+            if len(self._buffer) >= self.batch_chunks:
+                self.flush()
+        chunk.docs += 1
+        chunk.chunks += added
+
+        if added == 0:
+            writer.abort()
+            self._open.remove(writer)
+            self.summary.empty += 1
+        else:
+            self._complete.append(writer)
+        if not self._buffer:
+            self._commit_complete()
+
+    def flush(self) -> None:
+        from backend.embeddings.vector_store import write_batch
+
+        if self._buffer:
+            embed = self.summary.stage("embed")
+            start = time.perf_counter()
+            embeddings = embedder.encode_cached([r["text"] for _, r in self._buffer])
+            embed.seconds += time.perf_counter() - start
+            embed.chunks += len(self._buffer)
+
+            store = self.summary.stage("store")
+            start = time.perf_counter()
+            parts = []
+            i = 0
+            while i < len(self._buffer):
+                writer = self._buffer[i][0]
+                j = i
+                while j < len(self._buffer) and self._buffer[j][0] is writer:
+                    j += 1
+                parts.append((writer, embeddings[i:j], [r for _, r in self._buffer[i:j]]))
+                i = j
+            write_batch(parts)
+            store.seconds += time.perf_counter() - start
+            store.chunks += len(self._buffer)
+            self._buffer = []
+        self._commit_complete()
+
+    def _commit_complete(self) -> None:
+        from backend.embeddings.vector_store import commit_batch
+
+        commit_batch(self._complete)
+        for writer in self._complete:
+            self._open.remove(writer)
+            self.summary.ingested += 1
+            self.summary.stage("store").docs += 1
+            logger.info("ingested %s (%d chunks)", writer.doc_id, writer.chunks)
+        self._complete = []
+
+    def abort(self) -> None:
+        for writer in self._open:
+            writer.abort()
+        self._buffer, self._complete, self._open = [], [], []
+
+
+def _save_raw_text(pdf_path: Path, pages: list[dict]) -> None:
+    raw_text_dir().mkdir(parents=True, exist_ok=True)
+    text = normalize_text("\n\n".join(p["text"] for p in pages))
+    (raw_text_dir() / f"{pdf_path.stem}.txt").write_text(text, encoding="utf-8")
+
+
+def _ingest_pdfs(pdf_dir: Path, batcher: _Batcher, summary: BulkSummary) -> None:
+    if not pdf_dir.is_dir():
+        summary.failed[str(pdf_dir)] = "no such directory"
+        return
+    documents = doc_registry.load()
+    todo: list[Path] = []
+    hashes: dict[Path, str] = {}
+    for path in sorted(pdf_dir.iterdir()):
+        if not (path.is_file() and path.suffix.lower() == ".pdf"):
+            continue
+        try:
+            hashes[path] = file_hash(path)
+        except OSError as e:
+            summary.failed[str(path)] = str(e) or type(e).__name__
+            continue
+        previous = documents.get(pdf_doc_id(path.name))
+        if previous is not None and previous.content_hash == hashes[path]:
+            summary.unchanged += 1
+        else:
+            todo.append(path)
+
+    extract = summary.stage("extract")
+    for result in _timed(iter_pdf_files(todo, hashes=hashes), extract):
+        extract.docs += 1
+        if result.error is not None:
+            summary.failed[str(result.path)] = result.error
+            continue
+        _save_raw_text(result.path, result.pages)
+        batcher.add(
+            pdf_doc_id(result.path.name),
+            hashes[result.path],
+            pipeline.pdf_records(result.path, result.pages),
+        )
+
+
+def read_manifest(path: Path) -> list[str]:
+    """URLs from a manifest: one per line; blank lines and `#` comments are ignored."""
+    urls = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            urls.append(line)
+    return list(dict.fromkeys(urls))
+
+
+def _add_web_page(page: WebText, batcher: _Batcher, summary: BulkSummary) -> None:
+    if page.error is not None:
+        summary.failed[page.url] = page.error
+        return
+    text = normalize_text(page.text or "")
+    if not text:
+        summary.empty += 1
+        return
+    batcher.add(web_doc_id(page.url), content_hash(text), pipeline.web_records(page.url, text))
+
+
+def _ingest_urls(
+    urls: list[str], fetch_workers: int, batcher: _Batcher, summary: BulkSummary
+) -> None:
+    fetch = summary.stage("fetch")
+    window = 8 * max(1, fetch_workers)
+    for i in range(0, len(urls), window):
+        start = time.perf_counter()
+        pages = get_web_texts(urls[i : i + window], concurrency=fetch_workers)
+        fetch.seconds += time.perf_counter() - start
+        for page in pages:
+            fetch.docs += 1
+            _add_web_page(page, batcher, summary)
+
+
+def _ingest_site(
+    start_url: str, options: CrawlOptions, batcher: _Batcher, summary: BulkSummary
+) -> None:
+    stage = summary.stage("crawl")
+    stats = CrawlStats()
+    for page in _timed(crawl(start_url, options, stats=stats), stage):
+        stage.docs += 1
+        _add_web_page(page, batcher, summary)
+    summary.duplicates += stats.duplicates
+    summary.failed.update(stats.failed)
+    logger.info(
+        "crawled %s: %d pages fetched, %d duplicates, %d disallowed by robots.txt",
+        start_url, stats.fetched, stats.duplicates, stats.disallowed,
+    )
+
+
+def bulk_ingest(
+    pdf_dir: Path | None = None,
+    urls: list[str] | None = None,
+    batch_chunks: int = DEFAULT_BATCH_CHUNKS,
+    fetch_workers: int = WEB_CONCURRENCY,
+    sites: list[str] | None = None,
+    crawl_options: CrawlOptions | None = None,
+) -> BulkSummary:
+    summary = BulkSummary()
+    batcher = _Batcher(batch_chunks, summary)
+    start = time.perf_counter()
+    try:
+        if pdf_dir is not None:
+            _ingest_pdfs(pdf_dir, batcher, summary)
+        if urls:
+            _ingest_urls(urls, fetch_workers, batcher, summary)
+        for site in sites or ():
+            options = crawl_options or CrawlOptions(concurrency=fetch_workers)
+            _ingest_site(site, options, batcher, summary)
+        batcher.flush()
+    except BaseException:
+        batcher.abort()
+        raise
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-dir", type=Path, help=f"directory of PDFs (default: {raw_pdfs_dir()})")
+    parser.add_argument("--urls", type=Path, help="manifest file with one URL per line")
+    parser.add_argument("--batch-chunks", type=int, default=DEFAULT_BATCH_CHUNKS)
+    parser.add_argument("--fetch-workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--crawl", action="append", metavar="URL", help="crawl this site (repeatable)")
+    parser.add_argument("--max-depth", type=int, default=CrawlOptions.max_depth)
+    parser.add_argument("--max-pages", type=int, default=CrawlOptions.max_pages, help="per crawled site")
+    parser.add_argument(
+        "--allow", action="append", metavar="PREFIX", help="only follow links under this URL prefix"
+    )
+    args = parser.parse_args()
+
+    pdf_dir = args.pdf_dir
+    if pdf_dir is None and args.urls is None and not args.crawl:
+        pdf_dir = raw_pdfs_dir()
+    urls = read_manifest(args.urls) if args.urls else None
+    options = CrawlOptions(
+        max_depth=args.max_depth,
+        max_pages=args.max_pages,
+        allow_prefixes=tuple(args.allow or ()),
+        concurrency=args.fetch_workers,
+    )
+
+    summary = bulk_ingest(
+        pdf_dir, urls, args.batch_chunks, args.fetch_workers, sites=args.crawl, crawl_options=options
+    )
+    print(summary.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Bounded same-site crawler for documentation sites.
+
+Breadth-first from a start URL: pages are fetched concurrently in windows
+through the web cache (so re-crawls revalidate with conditional GETs), and
+each page is yielded as soon as its window arrives, so the caller can chunk
+and embed it while the crawl goes on. Only links under the allowed prefixes
+(by default the start URL's site) that robots.txt permits are followed.
+Pages are deduplicated by canonical URL (including rel=canonical) and by
+content hash.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+import re
+from urllib.parse import urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from backend.config import WEB_CONCURRENCY, WEB_PER_HOST
+from backend.embeddings.doc_registry import content_hash
+from backend.ingestion.web_cache_loader import WebText, get_web_texts
+from backend.ingestion.web_fetcher import fetch
+
+# Links to these are not pages worth crawling.
+SKIP_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".tar", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp",
+    ".ico", ".css", ".js", ".json", ".xml", ".mp4", ".mp3", ".woff", ".woff2",
+)
+
+
+@dataclass(frozen=True)
+class CrawlOptions:
+    max_depth: int = 2
+    max_pages: int = 50
+    # URL prefixes links must start with; empty means the start URL's site.
+    allow_prefixes: tuple[str, ...] = ()
+    concurrency: int = WEB_CONCURRENCY
+    per_host: int = WEB_PER_HOST
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    duplicates: int = 0
+    disallowed: int = 0
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+def canonicalize(url: str) -> str:
+    """Lower-case scheme/host, no default port, fragment or duplicate slashes."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if parts.port is not None and (scheme, parts.port) not in {("http", 80), ("https", 443)}:
+        netloc = f"{netloc}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def _site(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+def site_robots(url: str) -> Callable[[str], bool]:
+    """The robots.txt rules of `url`'s site as a predicate.
+
+    A missing robots.txt allows everything and a 401/403 nothing, as
+    `RobotFileParser.read` does.
+    """
+    parser = RobotFileParser()
+    try:
+        parser.parse((fetch(_site(url) + "robots.txt").text or "").splitlines())
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in (401, 403):
+            parser.disallow_all = True
+        else:
+            parser.allow_all = True
+    except httpx.HTTPError:
+        parser.allow_all = True
+    return lambda link: parser.can_fetch("*", link)
+
+
+def crawl(
+    start_url: str,
+    options: CrawlOptions = CrawlOptions(),
+    robots: Callable[[str], bool] | None = None,
+    stats: CrawlStats | None = None,
+) -> Iterator[WebText]:
+    """Yield the distinct pages reachable from `start_url`, breadth first.
+
+    `robots` decides whether a URL may be fetched (default: the robots.txt
+    of the URL's own site, read once per site). Failures and skipped pages
+    are counted in `stats`.
+    """
+    stats = stats if stats is not None else CrawlStats()
+    start = canonicalize(start_url)
+    prefixes = tuple(canonicalize(p) for p in options.allow_prefixes) or (_site(start),)
+    rules: dict[str, Callable[[str], bool]] = {}
+
+    def allowed(url: str) -> bool:
+        if robots is not None:
+            return robots(url)
+        site = _site(url)
+        if site not in rules:
+            rules[site] = site_robots(site)
+        return rules[site](url)
+
+    if not allowed(start):
+        stats.disallowed += 1
+        return
+
+    seen = {start}  # queued or known duplicate
+    crawled: set[str] = set()
+    hashes: set[str] = set()
+    yielded = 0
+    window = 4 * max(1, options.concurrency)
+    frontier = [start]
+
+    for depth in range(options.max_depth + 1):
+        next_level: list[str] = []
+        i = 0
+        while i < len(frontier) and yielded < options.max_pages:
+            batch = frontier[i : i + min(window, options.max_pages - yielded)]
+            i += len(batch)
+            for page in get_web_texts(batch, options.concurrency, options.per_host):
+                stats.fetched += 1
+                if page.error is not None or page.text is None:
+                    stats.failed[page.url] = page.error or "no text"
+                    continue
+
+                canonical = canonicalize(page.canonical) if page.canonical else page.url
+                digest = content_hash(page.text)
+                if canonical in crawled or digest in hashes:
+                    stats.duplicates += 1
+                    continue
+                crawled.update((page.url, canonical))
+                seen.add(canonical)
+                hashes.add(digest)
+
+                if depth < options.max_depth:
+                    for link in map(canonicalize, page.links):
+                        if link in seen or not link.startswith(prefixes):
+                            continue
+                        seen.add(link)
+                        if urlsplit(link).path.lower().endswith(SKIP_EXTENSIONS):
+                            continue
+                        if not allowed(link):
+                            stats.disallowed += 1
+                            continue
+                        next_level.append(link)
+
+                yield page
+                yielded += 1
+                if yielded >= options.max_pages:
+                    return
+        frontier = next_level
+        if not frontier:
+            return
@@ -0,0 +1,92 @@
+"""Speed and paragraph structure of the HTML-to-text parsers on saved pages.
+
+    python -m backend.ingestion.html_benchmark saved_pages/ --repeat 5
+
+Takes .html/.htm files or directories of them; without any, a synthetic
+docs page is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import time
+
+from backend.ingestion.web_loader import PARSERS, parse_page
+from backend.processing.chunker import make_paragraphs
+
+
+def _synthetic_page(sections: int = 200) -> str:
+    nav = "".join(f'<li><a href="/docs/page{i}">Page {i}</a></li>' for i in range(100))
+    body = "".join(
+        f"<h2>Section {i}</h2><p>{'Kubernetes schedules containers onto nodes. ' * 12}</p>"
+        f"<ul><li>first point</li><li>second <code>point</code></li></ul>"
+        f"<pre>kubectl get pods\n  -n default</pre>"
+        for i in range(sections)
+    )
+    return (
+        "<html><head><title>Docs</title><style>body{}</style><script>var x = 1;</script></head>"
+        f"<body><nav><ul>{nav}</ul></nav><main><h1>Overview</h1>{body}</main>"
+        "<footer>Copyright</footer></body></html>"
+    )
+
+
+def load_pages(paths: list[Path]) -> list[str]:
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in (".html", ".htm")))
+        else:
+            files.append(path)
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def parser_report(pages: list[str], repeat: int = 3) -> list[dict]:
+    """One row per parser: time per page, throughput and the paragraphs produced."""
+    size_mb = sum(len(p.encode("utf-8")) for p in pages) / (1 << 20)
+    rows = []
+    for parser in PARSERS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            texts = [parse_page(page, "https://example.com/", parser).text for page in pages]
+        seconds = (time.perf_counter() - start) / repeat
+        paragraphs = [p for text in texts for p in make_paragraphs(text)]
+        words = sum(len(p.split()) for p in paragraphs)
+        rows.append(
+            {
+                "parser": parser,
+                "ms_per_page": seconds * 1000.0 / len(pages),
+                "mb_per_s": size_mb / seconds if seconds > 0 else 0.0,
+                "chars": sum(len(t) for t in texts),
+                "paragraphs": len(paragraphs),
+                "words_per_paragraph": words / max(1, len(paragraphs)),
+            }
+        )
+    return rows
+
+
+def format_report(rows: list[dict]) -> str:
+    lines = [f"{'parser':<13}{'ms/page':>10}{'MB/s':>8}{'chars':>10}{'paragraphs':>12}{'words/para':>12}"]
+    for r in rows:
+        lines.append(
+            f"{r['parser']:<13}{r['ms_per_page']:>10.2f}{r['mb_per_s']:>8.1f}{r['chars']:>10}"
+            f"{r['paragraphs']:>12}{r['words_per_paragraph']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="saved .html files or directories")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths) if args.paths else [_synthetic_page()]
+    if not pages:
+        parser.error("no .html/.htm files found")
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / (1 << 20):.1f} MB")
+    print(format_report(parser_report(pages, repeat=max(1, args.repeat))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Extracted PDF page text, keyed by (PDF content hash, backend, page number).
+
+Stored in `data/cache/pdf_pages.sqlite`; blank pages are not stored. Pages
+are written as they are extracted, but a document only counts as cached once
+it is marked complete, so an interrupted extraction is simply redone.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Iterator
+
+from backend.utils.paths import cache_dir
+
+_local = threading.local()
+
+
+def _cache_path() -> Path:
+    return cache_dir() / "pdf_pages.sqlite"
+
+
+def _connect() -> sqlite3.Connection:
+    path = _cache_path()
+    conn: sqlite3.Connection | None = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS pages (
+            doc_hash TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (doc_hash, backend, page)
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_hash TEXT NOT NULL,
+            backend TEXT NOT NULL,
+            pages INTEGER NOT NULL,
+            PRIMARY KEY (doc_hash, backend)
+        );
+        """
+    )
+    _local.conn = conn
+    _local.path = path
+    return conn
+
+
+def is_complete(doc_hash: str, backend: str) -> bool:
+    row = _connect().execute(
+        "SELECT 1 FROM documents WHERE doc_hash = ? AND backend = ?", (doc_hash, backend)
+    ).fetchone()
+    return row is not None
+
+
+def iter_pages(doc_hash: str, backend: str) -> Iterator[dict]:
+    """Yield the cached pages in order, without loading them all at once."""
+    rows = _connect().execute(
+        "SELECT page, text FROM pages WHERE doc_hash = ? AND backend = ? ORDER BY page",
+        (doc_hash, backend),
+    )
+    for page, text in rows:
+        yield {"page": page, "text": text}
+
+
+def put_pages(doc_hash: str, backend: str, pages: list[dict]) -> None:
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO pages (doc_hash, backend, page, text) VALUES (?, ?, ?, ?)",
+            [(doc_hash, backend, int(p["page"]), p["text"]) for p in pages],
+        )
+
+
+def mark_complete(doc_hash: str, backend: str, n_pages: int) -> None:
+    """Record that every page of the document has been stored."""
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (doc_hash, backend, pages) VALUES (?, ?, ?)",
+            (doc_hash, backend, n_pages),
+        )
+
+
+def clear() -> None:
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM pages")
+        conn.execute("DELETE FROM documents")
@@ -1,20 +1,317 @@
+"""PDF text extraction, page by page.
+
+Text comes from one of several backends (PyMuPDF and pypdfium2 are much
+faster than pdfplumber). Small PDFs are read serially. Larger ones are split
+into page ranges that a shared process pool extracts in parallel; pages are
+still yielded in order, as soon as every earlier page is done, so chunking
+can start before the last range finishes, and only a few ranges run ahead of
+the consumer. Extracted pages go to `page_cache`, so an unchanged PDF is
+never extracted twice.
+"""
+
 from __future__ import annotations
 
-import pdfplumber
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+from pathlib import Path
+import threading
+from typing import Iterable, Iterator, Mapping
 
+from backend.config import (
+    PDF_BACKEND,
+    PDF_PAGE_CACHE_ENABLED,
+    PDF_PAGES_PER_TASK,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_WORKERS,
+)
+from backend.ingestion import page_cache
+
+# Fastest first; "auto" picks the first one that is installed.
+BACKENDS = ("pymupdf", "pypdfium2", "pdfplumber")
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _workers() -> int:
+    return PDF_WORKERS if PDF_WORKERS > 0 else min(8, os.cpu_count() or 1)
+
+
+def _pool() -> ProcessPoolExecutor:
+    """Process-wide extraction pool, started on first use."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                # "spawn" keeps workers clear of the parent's torch/FAISS threads.
+                _POOL = ProcessPoolExecutor(
+                    max_workers=_workers(), mp_context=multiprocessing.get_context("spawn")
+                )
+    return _POOL
+
+
+def resolve_backend(backend: str | None = None) -> str:
+    """Return the backend to use for `backend` (default: `RAG_PDF_BACKEND`)."""
+    backend = (backend or PDF_BACKEND).lower()
+    if backend == "auto":
+        for name in BACKENDS:
+            if importlib.util.find_spec(name) is not None:
+                return name
+        raise RuntimeError(f"No PDF backend installed (install one of {BACKENDS})")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {backend!r} (expected one of {BACKENDS} or 'auto')")
+    return backend
+
+
+def _pymupdf_texts(pdf_path: str, start: int, stop: int | None) -> Iterator[str]:
+    import pymupdf
+
+    with pymupdf.open(pdf_path) as doc:
+        for i in range(start, doc.page_count if stop is None else stop):
+            yield doc[i].get_text()
 
-def load_pdf_pages(pdf_path: str) -> list[dict]:
-    """Return a list of {page: int, text: str}."""
-    pages: list[dict] = []
+
+def _pypdfium2_texts(pdf_path: str, start: int, stop: int | None) -> Iterator[str]:
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        for i in range(start, len(pdf) if stop is None else stop):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_texts(pdf_path: str, start: int, stop: int | None) -> Iterator[str]:
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            yield page.extract_text() or ""
+
+
+_TEXTS = {
+    "pymupdf": _pymupdf_texts,
+    "pypdfium2": _pypdfium2_texts,
+    "pdfplumber": _pdfplumber_texts,
+}
+
+
+def page_count(pdf_path: str, backend: str | None = None) -> int:
+    backend = resolve_backend(backend)
+    if backend == "pymupdf":
+        import pymupdf
+
+        with pymupdf.open(pdf_path) as doc:
+            return doc.page_count
+    if backend == "pypdfium2":
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    import pdfplumber
 
     with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text() or ""
-            text = text.strip()
-            if text:
-                pages.append({"page": i, "text": text})
+        return len(pdf.pages)
+
 
-    return pages
+def _iter_range(pdf_path: str, start: int, stop: int, backend: str) -> Iterator[dict]:
+    for i, text in enumerate(_TEXTS[backend](pdf_path, start, stop), start=start + 1):
+        text = text.strip()
+        if text:
+            yield {"page": i, "text": text}
+
+
+def _extract_range(pdf_path: str, start: int, stop: int, backend: str) -> list[dict]:
+    """Extract pages [start, stop) (0-based); runs in a worker process."""
+    return list(_iter_range(pdf_path, start, stop, backend))
+
+
+def file_hash(pdf_path: str | Path) -> str:
+    """sha256 of the file bytes (the same value as `doc_registry.content_hash`)."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ranges(n_pages: int) -> list[tuple[int, int]]:
+    step = max(1, PDF_PAGES_PER_TASK)
+    return [(i, min(i + step, n_pages)) for i in range(0, n_pages, step)]
+
+
+def _extract(pdf_path: str, n_pages: int, backend: str, workers: int) -> Iterator[dict]:
+    if workers <= 1 or n_pages < PDF_PARALLEL_MIN_PAGES:
+        yield from _iter_range(pdf_path, 0, n_pages, backend)
+        return
+
+    # At most two ranges per worker are in flight: a slow consumer holds back
+    # extraction instead of letting finished pages pile up in memory.
+    ranges = iter(_ranges(n_pages))
+    window: deque[Future] = deque()
+
+    def submit_next() -> None:
+        next_range = next(ranges, None)
+        if next_range is not None:
+            window.append(_pool().submit(_extract_range, pdf_path, *next_range, backend))
+
+    try:
+        for _ in range(2 * workers):
+            submit_next()
+        while window:
+            pages = window.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for f in window:
+            f.cancel()
+
+
+def iter_pdf_pages(
+    pdf_path: str,
+    workers: int | None = None,
+    backend: str | None = None,
+    doc_hash: str | None = None,
+) -> Iterator[dict]:
+    """Yield {page: int, text: str} for each page with text, in page order.
+
+    `workers` > 1 (default: `RAG_PDF_WORKERS`, or the CPU count) extracts
+    page ranges in parallel once the PDF has `RAG_PDF_PARALLEL_MIN_PAGES`
+    pages; page numbers are the same either way. Pages come from the page
+    cache when this PDF (`doc_hash`, computed if not given) was already
+    extracted with the same backend.
+    """
+    backend = resolve_backend(backend)
+    workers = _workers() if workers is None else workers
+    if not PDF_PAGE_CACHE_ENABLED:
+        yield from _extract(pdf_path, page_count(pdf_path, backend), backend, workers)
+        return
+
+    doc_hash = doc_hash or file_hash(pdf_path)
+    if page_cache.is_complete(doc_hash, backend):
+        yield from page_cache.iter_pages(doc_hash, backend)
+        return
+
+    n_pages = page_count(pdf_path, backend)
+    batch: list[dict] = []
+    for page in _extract(pdf_path, n_pages, backend, workers):
+        batch.append(page)
+        if len(batch) >= PDF_PAGES_PER_TASK:
+            page_cache.put_pages(doc_hash, backend, batch)
+            batch = []
+        yield page
+    page_cache.put_pages(doc_hash, backend, batch)
+    page_cache.mark_complete(doc_hash, backend, n_pages)
+
+
+@dataclass(frozen=True)
+class ExtractedPdf:
+    path: Path
+    pages: list[dict]
+    # Set instead of `pages` when the file could not be read.
+    error: str | None = None
+
+
+@dataclass
+class _PendingPdf:
+    doc_hash: str
+    n_pages: int
+    results: list[list[dict] | None]
+
+
+def iter_pdf_files(
+    pdf_paths: Iterable[str | Path],
+    backend: str | None = None,
+    hashes: Mapping[Path, str] | None = None,
+) -> Iterator[ExtractedPdf]:
+    """Extract many PDFs on the shared pool, yielding each file as it completes.
+
+    Page ranges of consecutive files share the pool, so small files do not
+    wait behind a large one and a large one still spreads across all
+    workers. As in `iter_pdf_pages`, at most two ranges per worker are in
+    flight. Cached files (looked up by their `hashes` entry, computed if
+    missing) are yielded without extraction; a file that fails is yielded
+    with `error` set rather than stopping the others.
+    """
+    backend = resolve_backend(backend)
+    paths = iter(map(Path, pdf_paths))
+    tasks: deque[tuple[Path, int, int, int]] = deque()
+    files: dict[Path, _PendingPdf] = {}
+    running: dict[Future, tuple[Path, int]] = {}
+    try:
+        while True:
+            while len(running) < 2 * _workers():
+                if not tasks:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    try:
+                        doc_hash = ""
+                        if PDF_PAGE_CACHE_ENABLED:
+                            doc_hash = (hashes or {}).get(path) or file_hash(path)
+                        if doc_hash and page_cache.is_complete(doc_hash, backend):
+                            yield ExtractedPdf(path, list(page_cache.iter_pages(doc_hash, backend)))
+                            continue
+                        ranges = _ranges(page_count(str(path), backend))
+                    except Exception as e:
+                        yield ExtractedPdf(path, [], error=str(e) or type(e).__name__)
+                        continue
+                    if not ranges:
+                        yield ExtractedPdf(path, [])
+                        continue
+                    files[path] = _PendingPdf(doc_hash, ranges[-1][1], [None] * len(ranges))
+                    tasks.extend((path, i, a, b) for i, (a, b) in enumerate(ranges))
+                path, i, a, b = tasks.popleft()
+                running[_pool().submit(_extract_range, str(path), a, b, backend)] = (path, i)
+
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, i = running.pop(future)
+                pending = files.get(path)
+                if pending is None:
+                    continue  # An earlier range of this file already failed.
+                try:
+                    pending.results[i] = future.result()
+                except Exception as e:
+                    del files[path]
+                    yield ExtractedPdf(path, [], error=str(e) or type(e).__name__)
+                    continue
+                if any(r is None for r in pending.results):
+                    continue
+                del files[path]
+                pages = [page for r in pending.results for page in r or ()]
+                if pending.doc_hash:
+                    page_cache.put_pages(pending.doc_hash, backend, pages)
+                    page_cache.mark_complete(pending.doc_hash, backend, pending.n_pages)
+                yield ExtractedPdf(path, pages)
+    finally:
+        for f in running:
+            f.cancel()
+
+
+def load_pdf_pages(
+    pdf_path: str, workers: int | None = None, backend: str | None = None
+) -> list[dict]:
+    """Return a list of {page: int, text: str}."""
+    return list(iter_pdf_pages(pdf_path, workers, backend))
 
 
 def load_pdf_as_text(pdf_path: str) -> str:
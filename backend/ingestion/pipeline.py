@@ -0,0 +1,125 @@
+"""Streaming ingestion: extract -> normalize -> chunk -> embed -> append.
+
+Every stage is a generator that only pulls input when the next stage asks
+for more, so a slow stage holds back the ones before it. In memory at any
+time are one batch of chunks (`RAG_INGEST_BATCH_CHUNKS` /
+`RAG_INGEST_BATCH_MB`) and the few PDF page ranges extracted ahead of it,
+whatever the size of the document.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from backend.config import INGEST_BATCH_CHUNKS, INGEST_BATCH_MB
+from backend.ingestion.pdf_loader import iter_pdf_pages
+from backend.ingestion.text_cleaner import normalize_text
+from backend.processing.chunker import chunk_text
+from backend.processing.near_dup import DedupStats, drop_near_duplicates
+from backend.utils.logger import get_logger
+from backend.utils.paths import raw_text_dir
+
+logger = get_logger(__name__)
+
+_last_dedup: DedupStats | None = None
+
+
+def pdf_pages(pdf_path: Path, doc_hash: str | None = None) -> Iterator[dict]:
+    """Extracted pages, also written to `raw_text_dir()/<stem>.txt` as they pass."""
+    raw_text_dir().mkdir(parents=True, exist_ok=True)
+    dest = raw_text_dir() / f"{pdf_path.stem}.txt"
+    tmp = dest.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        separator = ""
+        for page in iter_pdf_pages(str(pdf_path), doc_hash=doc_hash):
+            text = normalize_text(page["text"])
+            if text:
+                f.write(separator + text)
+                separator = "\n\n"
+            yield page
+    os.replace(tmp, dest)
+
+
+def pdf_records(pdf_path: Path, pages: Iterable[dict]) -> Iterator[dict]:
+    for p in pages:
+        page_num = int(p["page"])
+        page_text = normalize_text(p["text"])
+        if not page_text:
+            continue
+
+        for chunk in chunk_text(page_text):
+            yield {
+                "text": chunk,
+                "type": "pdf",
+                "file": pdf_path.name,
+                "page": page_num,
+                "source": f"{pdf_path.name} (page {page_num})",
+            }
+
+
+def web_records(url: str, text: str) -> Iterator[dict]:
+    for chunk in chunk_text(text):
+        yield {"text": chunk, "type": "web", "url": url, "source": url}
+
+
+def batched(
+    records: Iterable[dict],
+    max_chunks: int = INGEST_BATCH_CHUNKS,
+    max_bytes: int = INGEST_BATCH_MB << 20,
+) -> Iterator[list[dict]]:
+    """Group records into batches of at most `max_chunks` records / `max_bytes` of text."""
+    batch: list[dict] = []
+    size = 0
+    for record in records:
+        batch.append(record)
+        size += len(record["text"].encode("utf-8"))
+        if len(batch) >= max_chunks or size >= max_bytes:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def ingest_records(doc_id: str, content_hash: str, records: Iterable[dict]) -> int | None:
+    """Store `records` as the new version of `doc_id`, one batch at a time.
+
+    Near-duplicates of earlier chunks of the document are skipped. Returns
+    the number of chunks stored, 0 if there were none (the document is left
+    as it was), or None if this content is already stored.
+    """
+    # Imported here so the PDF extraction workers, which re-import the main
+    # module (e.g. the bulk CLI), do not load FAISS.
+    from backend.embeddings.vector_store import upsert_document_batches
+
+    global _last_dedup
+    _last_dedup = stats = DedupStats()
+    batches = batched(drop_near_duplicates(records, stats))
+    first = next(batches, None)
+    if first is None:
+        return 0
+
+    def _all() -> Iterator[list[dict]]:
+        yield first
+        yield from batches
+
+    chunks = upsert_document_batches(doc_id, content_hash, _all())
+    if stats.duplicates:
+        logger.info("%s: skipped %d of %d chunks as near-duplicates", doc_id, stats.duplicates, stats.chunks)
+    return chunks
+
+
+def last_dedup_stats() -> DedupStats | None:
+    """Near-duplicate counts of the most recent `ingest_records` in this process."""
+    return _last_dedup
+
+
+def ingest_pdf(pdf_path: Path, doc_id: str, content_hash: str) -> int | None:
+    records = pdf_records(pdf_path, pdf_pages(pdf_path, doc_hash=content_hash))
+    return ingest_records(doc_id, content_hash, records)
+
+
+def ingest_web_text(url: str, text: str, doc_id: str, content_hash: str) -> int | None:
+    return ingest_records(doc_id, content_hash, web_records(url, text))
@@ -1,11 +1,42 @@
+"""Web page text cached in `data/raw/raw_web/`.
+
+Next to each `<name>.txt` a `<name>.json` sidecar keeps the response's ETag
+and Last-Modified and when the page was last checked. A copy younger than
+`RAG_WEB_MAX_AGE` seconds is served as is; an older one is revalidated with a
+conditional GET, and a 304 keeps the cached text (and so its content hash,
+which means no re-embedding). The sidecar also keeps the page's links and
+rel=canonical URL for the crawler, since a 304 carries no HTML to find them in.
+"""
+
 from __future__ import annotations
 
+from dataclasses import dataclass
+import json
+import os
 import re
 from pathlib import Path
+import time
+
+import httpx
 
-from backend.ingestion.web_loader import load_webpage_as_text
+from backend.config import WEB_CONCURRENCY, WEB_MAX_AGE, WEB_PER_HOST
+from backend.ingestion.web_fetcher import FetchResult, Validators, fetch, fetch_many
+from backend.ingestion.web_loader import parse_page
+from backend.utils.logger import get_logger
 from backend.utils.paths import raw_web_dir
 
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class WebText:
+    url: str
+    text: str | None
+    not_modified: bool = False
+    error: str | None = None
+    links: tuple[str, ...] = ()
+    canonical: str | None = None
+
 
 def url_to_filename(url: str) -> str:
     filename = re.sub(r"https?://", "", url)
@@ -13,20 +44,102 @@ def url_to_filename(url: str) -> str:
     return filename.strip("_") + ".txt"
 
 
-def get_web_text(url: str) -> str:
+def _paths(url: str) -> tuple[Path, Path]:
+    cache_path = raw_web_dir() / url_to_filename(url)
+    return cache_path, cache_path.with_suffix(".json")
+
+
+def _load(url: str) -> tuple[str | None, dict]:
+    cache_path, meta_path = _paths(url)
+    if not cache_path.exists():
+        return None, {}
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        meta = {}
+    return cache_path.read_text(encoding="utf-8"), meta
+
+
+def _is_fresh(meta: dict) -> bool:
+    return time.time() - float(meta.get("checked_at", 0)) < WEB_MAX_AGE
+
+
+def _validators(meta: dict) -> Validators:
+    return Validators(meta.get("etag"), meta.get("last_modified"))
+
+
+def _write(path: Path, text: str) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _cached_page(url: str, text: str, meta: dict) -> WebText:
+    return WebText(
+        url, text, not_modified=True, links=tuple(meta.get("links", ())), canonical=meta.get("canonical")
+    )
+
+
+def _store(url: str, cached: str | None, meta: dict, result: FetchResult) -> WebText:
     raw_web_dir().mkdir(parents=True, exist_ok=True)
+    cache_path, meta_path = _paths(url)
+    if result.not_modified and cached is not None:
+        text, links, canonical = cached, meta.get("links", []), meta.get("canonical")
+    else:
+        page = parse_page(result.text or "", result.final_url or url)
+        text, links, canonical = page.text, list(page.links), page.canonical
+        _write(cache_path, text)
+    meta = {
+        "url": url,
+        "etag": result.validators.etag,
+        "last_modified": result.validators.last_modified,
+        "checked_at": time.time(),
+        "links": links,
+        "canonical": canonical,
+    }
+    _write(meta_path, json.dumps(meta))
+    return WebText(url, text, text == cached, links=tuple(links), canonical=canonical)
+
+
+def get_web_text(url: str) -> str:
+    cached, meta = _load(url)
+    if cached is not None and _is_fresh(meta):
+        return cached
+
+    try:
+        result = fetch(url, _validators(meta) if cached is not None else None)
+    except httpx.HTTPError as e:
+        if cached is None:
+            raise
+        logger.warning("could not revalidate %s (%s); using the cached copy", url, e)
+        return cached
+    return _store(url, cached, meta, result).text or ""
 
-    filename = url_to_filename(url)
-    cache_path = raw_web_dir() / filename
 
-    if cache_path.exists():
-        return cache_path.read_text(encoding="utf-8")
+def get_web_texts(
+    urls: list[str], concurrency: int = WEB_CONCURRENCY, per_host: int = WEB_PER_HOST
+) -> list[WebText]:
+    """`get_web_text` for many URLs, fetched concurrently; results in input order.
 
-    text = load_webpage_as_text(url)
+    A failed fetch falls back to the cached copy if there is one, otherwise
+    its `error` is set.
+    """
+    cache = {url: _load(url) for url in urls}
+    stale = [url for url in cache if cache[url][0] is None or not _is_fresh(cache[url][1])]
+    validators = {url: _validators(cache[url][1]) for url in stale if cache[url][0] is not None}
 
-    cache_path.write_text(text, encoding="utf-8")
+    fetched: dict[str, WebText] = {}
+    for result in fetch_many(stale, validators, concurrency, per_host):
+        cached, meta = cache[result.url]
+        if result.error is None:
+            fetched[result.url] = _store(result.url, cached, meta, result)
+        elif cached is not None:
+            logger.warning("could not revalidate %s (%s); using the cached copy", result.url, result.error)
+            fetched[result.url] = _cached_page(result.url, cached, meta)
+        else:
+            fetched[result.url] = WebText(result.url, None, error=result.error)
 
-    return text
+    return [fetched.get(url) or _cached_page(url, *cache[url]) for url in urls]
 
 
 if __name__ == "__main__":
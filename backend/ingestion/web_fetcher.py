@@ -0,0 +1,131 @@
+"""Pooled HTTP fetching with conditional requests.
+
+Single fetches share one keep-alive `httpx.Client`; `fetch_many` drives an
+`httpx.AsyncClient` over many URLs at once, at most `RAG_WEB_CONCURRENCY`
+requests in flight and `RAG_WEB_PER_HOST` per host. Passing the ETag /
+Last-Modified of a cached copy makes the request conditional, so a page that
+has not changed costs a bodyless 304.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import threading
+
+import httpx
+
+from backend.config import WEB_CONCURRENCY, WEB_PER_HOST
+
+TIMEOUT = 10.0
+
+_CLIENT: httpx.Client | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    """Outcome of one GET; `text` is None when not modified or on error.
+
+    `final_url` is where redirects ended up (relative links resolve against it).
+    """
+
+    url: str
+    status: int = 0
+    text: str | None = None
+    validators: Validators = Validators()
+    error: str | None = None
+    final_url: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+def _limits(concurrency: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+
+def get_client() -> httpx.Client:
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(
+                limits=_limits(WEB_CONCURRENCY), timeout=TIMEOUT, follow_redirects=True
+            )
+        return _CLIENT
+
+
+def _result(url: str, response: httpx.Response, sent: Validators | None) -> FetchResult:
+    if response.status_code == 304:
+        # A 304 may omit the validators; the ones we sent are still current.
+        validators = Validators(
+            response.headers.get("ETag") or (sent.etag if sent else None),
+            response.headers.get("Last-Modified") or (sent.last_modified if sent else None),
+        )
+        return FetchResult(url, 304, None, validators)
+
+    response.raise_for_status()
+    validators = Validators(response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return FetchResult(
+        url, response.status_code, response.text, validators, final_url=str(response.url)
+    )
+
+
+def fetch(url: str, validators: Validators | None = None) -> FetchResult:
+    """GET `url` on the shared client; raises `httpx.HTTPError` on failure."""
+    headers = validators.headers() if validators else {}
+    return _result(url, get_client().get(url, headers=headers), validators)
+
+
+async def afetch_many(
+    urls: list[str],
+    validators: dict[str, Validators] | None = None,
+    concurrency: int = WEB_CONCURRENCY,
+    per_host: int = WEB_PER_HOST,
+) -> list[FetchResult]:
+    """Fetch `urls` concurrently; results are in input order, errors in `error`."""
+    validators = validators or {}
+    total = asyncio.Semaphore(max(1, concurrency))
+    hosts: dict[str, asyncio.Semaphore] = {}
+
+    async with httpx.AsyncClient(
+        limits=_limits(max(1, concurrency)), timeout=TIMEOUT, follow_redirects=True
+    ) as client:
+
+        async def one(url: str) -> FetchResult:
+            sent = validators.get(url)
+            try:
+                host = hosts.setdefault(httpx.URL(url).host, asyncio.Semaphore(max(1, per_host)))
+                # Wait for the host slot first so a busy host does not hold global slots.
+                async with host, total:
+                    response = await client.get(url, headers=sent.headers() if sent else {})
+                return _result(url, response, sent)
+            except (httpx.HTTPError, httpx.InvalidURL) as e:
+                return FetchResult(url, error=str(e) or type(e).__name__)
+
+        return list(await asyncio.gather(*(one(url) for url in urls)))
+
+
+def fetch_many(
+    urls: list[str],
+    validators: dict[str, Validators] | None = None,
+    concurrency: int = WEB_CONCURRENCY,
+    per_host: int = WEB_PER_HOST,
+) -> list[FetchResult]:
+    """Blocking `afetch_many`; from async code await `afetch_many` instead."""
+    return asyncio.run(afetch_many(urls, validators, concurrency, per_host))
@@ -1,12 +1,157 @@
-import requests
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import groupby
+import re
+from urllib.parse import urldefrag, urljoin
+
 from bs4 import BeautifulSoup
 
+from backend.config import HTML_PARSER
+from backend.ingestion.web_fetcher import fetch
 
-def load_webpage_as_text(url: str) -> str:
-    response = requests.get(url, timeout=10)
-    response.raise_for_status()
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # pragma: no cover - lxml is in requirements.txt
+    lxml = None
+
+PARSERS = ("lxml", "html.parser")
+
+# Never text: dropped with everything inside them.
+_DROP_TAGS = frozenset({"script", "style", "noscript", "template", "svg", "title", "iframe"})
+# Site chrome: their text is dropped, but their links are still followed.
+_BOILERPLATE_TAGS = frozenset({"nav", "footer"})
+_BOILERPLATE_ROLES = frozenset({"navigation", "contentinfo"})
+# Start a new paragraph ("\n\n") or just a new line.
+_PARAGRAPH_TAGS = frozenset(
+    {"h1", "h2", "h3", "h4", "h5", "h6", "p", "pre", "blockquote", "ul", "ol", "dl", "table", "hr"}
+)
+_LINE_TAGS = frozenset(
+    {"br", "div", "li", "tr", "dt", "dd", "section", "article", "main", "header", "figure", "figcaption"}
+)
+
+
+@dataclass(frozen=True)
+class ParsedPage:
+    text: str
+    links: tuple[str, ...] = ()
+    canonical: str | None = None
+
+
+def resolve_parser(parser: str | None = None) -> str:
+    """The parser to use: `parser`, else RAG_HTML_PARSER, with "auto" meaning lxml if installed."""
+    parser = (parser or HTML_PARSER).strip().lower()
+    if parser == "auto":
+        return "lxml" if lxml is not None else "html.parser"
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown HTML parser {parser!r}; expected one of {PARSERS} or 'auto'.")
+    if parser == "lxml" and lxml is None:
+        raise RuntimeError("RAG_HTML_PARSER=lxml but lxml is not installed (pip install lxml).")
+    return parser
+
+
+def _absolute(url: str, href: str) -> str | None:
+    link = urldefrag(urljoin(url, href.strip())).url
+    return link if link.startswith(("http://", "https://")) else None
+
+
+def _parse_lxml(html: str, url: str) -> ParsedPage:
+    """One walk over the tree: links, canonical URL and text with block breaks.
+
+    Whitespace inside text is collapsed as a browser would (except in
+    <pre>); headings and other paragraph-level blocks become blank lines so
+    `make_paragraphs` splits on them.
+    """
+    if not html.strip():
+        return ParsedPage("")
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    try:
+        root = lxml.html.fromstring(html.encode("utf-8"), parser=parser)
+    except lxml.etree.ParserError:  # nothing but whitespace/comments
+        return ParsedPage("")
+
+    out: list[str] = []
+    verbatim: set[int] = set()  # indexes in `out` of <pre> text
+    links: list[str] = []
+    canonical = None
+    hidden = 0  # depth inside nav/footer
+    pre = 0
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    def emit(text: str | None) -> None:
+        if text and not hidden:
+            if pre:
+                verbatim.add(len(out))
+                out.append(text)
+            else:
+                out.append(re.sub(r"\s+", " ", text))
+
+    def new_block(tag: str) -> None:
+        brk = "\n\n" if tag in _PARAGRAPH_TAGS else "\n" if tag in _LINE_TAGS else ""
+        if not brk:
+            return
+        if out and out[-1] in ("\n", "\n\n"):
+            out[-1] = max(out[-1], brk, key=len)
+        else:
+            out.append(brk)
+
+    walk = lxml.etree.iterwalk(root, events=("start", "end", "comment", "pi"))
+    for event, el in walk:
+        if event in ("comment", "pi"):
+            emit(el.tail)
+            continue
+        tag = el.tag
+        if event == "start":
+            if tag in _DROP_TAGS:
+                walk.skip_subtree()
+                continue
+            if tag == "a" and el.get("href"):
+                link = _absolute(url, el.get("href"))
+                if link:
+                    links.append(link)
+            elif tag == "link" and el.get("href") and "canonical" in (el.get("rel") or "").lower().split():
+                canonical = urljoin(url, el.get("href").strip())
+
+            if tag in _BOILERPLATE_TAGS or el.get("role") in _BOILERPLATE_ROLES:
+                hidden += 1
+            if tag == "pre":
+                pre += 1
+            new_block(tag)
+            emit(el.text)
+        else:
+            if tag not in _DROP_TAGS:
+                new_block(tag)
+                if tag == "pre":
+                    pre -= 1
+                if tag in _BOILERPLATE_TAGS or el.get("role") in _BOILERPLATE_ROLES:
+                    hidden -= 1
+            emit(el.tail)
+
+    # Trim spaces around block breaks; <pre> text (always between breaks,
+    # as a paragraph tag) keeps its indentation and blank lines.
+    parts = []
+    for is_pre, indexes in groupby(range(len(out)), key=verbatim.__contains__):
+        part = "".join(out[i] for i in indexes)
+        if not is_pre:
+            part = re.sub(r"\n{3,}", "\n\n", re.sub(r"[ \t]*\n[ \t]*", "\n", part))
+        parts.append(part)
+    text = "".join(parts).strip()
+    return ParsedPage(text, tuple(dict.fromkeys(links)), canonical)
+
+
+def _parse_bs4(html: str, url: str) -> ParsedPage:
+    soup = BeautifulSoup(html, "html.parser")
+
+    links = []
+    for a in soup.find_all("a", href=True):
+        link = _absolute(url, a["href"])
+        if link:
+            links.append(link)
+
+    canonical = None
+    tag = soup.find("link", rel="canonical", href=True)
+    if tag is not None:
+        canonical = urljoin(url, tag["href"].strip())
 
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
@@ -14,7 +159,22 @@ def load_webpage_as_text(url: str) -> str:
     text = soup.get_text(separator="\n")
 
     lines = [line.strip() for line in text.splitlines() if line.strip()]
-    return "\n".join(lines)
+    return ParsedPage("\n".join(lines), tuple(dict.fromkeys(links)), canonical)
+
+
+def parse_page(html: str, url: str, parser: str | None = None) -> ParsedPage:
+    """Visible text, absolute outgoing links and the rel=canonical URL of a page."""
+    if resolve_parser(parser) == "lxml":
+        return _parse_lxml(html, url)
+    return _parse_bs4(html, url)
+
+
+def html_to_text(html: str, parser: str | None = None) -> str:
+    return parse_page(html, "", parser).text
+
+
+def load_webpage_as_text(url: str) -> str:
+    return html_to_text(fetch(url).text or "")
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from pathlib import Path
+import threading
+import weakref
 
 from typing import Optional
 
@@ -12,9 +15,17 @@ _env_file = _repo_root / ".env"
 if _env_file.exists():
     load_dotenv(dotenv_path=_env_file)
 
-from groq import Groq
+from groq import AsyncGroq, Groq
+
+from backend.config import LLM_CONCURRENCY
 
 _client: Optional[Groq] = None
+_client_lock = threading.Lock()
+# One async client and concurrency limit per event loop: neither may be
+# shared across loops.
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, tuple[AsyncGroq, asyncio.Semaphore]
+] = weakref.WeakKeyDictionary()
 
 
 def _get_groq_api_key() -> str | None:
@@ -38,6 +49,13 @@ def _get_client() -> Groq:
     if _client is not None:
         return _client
 
+    with _client_lock:
+        if _client is None:
+            _client = Groq(api_key=_require_api_key())
+    return _client
+
+
+def _require_api_key() -> str:
     api_key = _get_groq_api_key()
     if not api_key:
         raise RuntimeError(
@@ -47,15 +65,20 @@ def _get_client() -> Groq:
             "PowerShell (persistent):       setx GROQ_API_KEY \"YOUR_KEY\"\n"
             "cmd (current session):         set GROQ_API_KEY=YOUR_KEY"
         )
+    return api_key
 
-    _client = Groq(api_key=api_key)
-    return _client
 
+def _get_async_client() -> tuple[AsyncGroq, asyncio.Semaphore]:
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        entry = (AsyncGroq(api_key=_require_api_key()), asyncio.Semaphore(max(1, LLM_CONCURRENCY)))
+        _async_clients[loop] = entry
+    return entry
 
-def generate_answer(prompt: str) -> str:
-    client = _get_client()
 
-    chat_completion = client.chat.completions.create(
+def _completion_args(prompt: str) -> dict:
+    return dict(
         model="llama-3.3-70b-versatile",
         messages=[
             {"role": "system", "content": "You are a helpful assistant."},
@@ -65,4 +88,20 @@ def generate_answer(prompt: str) -> str:
         max_tokens=300
     )
 
+
+def generate_answer(prompt: str) -> str:
+    client = _get_client()
+
+    chat_completion = client.chat.completions.create(**_completion_args(prompt))
+
+    return chat_completion.choices[0].message.content.strip()
+
+
+async def agenerate_answer(prompt: str) -> str:
+    """`generate_answer` on the async client; at most RAG_LLM_CONCURRENCY calls per event loop are in flight."""
+    client, limit = _get_async_client()
+
+    async with limit:
+        chat_completion = await client.chat.completions.create(**_completion_args(prompt))
+
     return chat_completion.choices[0].message.content.strip()
@@ -0,0 +1,118 @@
+"""Speed and peak memory of `make_chunks` vs the span-based `word_chunk_spans`.
+
+    python -m backend.processing.chunk_benchmark                 # data/raw text caches
+    python -m backend.processing.chunk_benchmark corpus/ --repeat 3
+    python -m backend.processing.chunk_benchmark --synthetic-mb 50
+
+Also checks that both produce the same chunks (word for word).
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from pathlib import Path
+import random
+import time
+import tracemalloc
+
+from backend.processing.chunker import make_chunks, word_chunk_spans
+from backend.utils.paths import raw_text_dir, raw_web_dir, text_files
+
+
+def _spans_as_text(text: str) -> list[str]:
+    return [text[s:e] for s, e in word_chunk_spans(text)]
+
+
+CHUNKERS: dict[str, Callable[[str], list]] = {
+    "make_chunks": make_chunks,
+    "word_chunk_spans": word_chunk_spans,
+    "spans+text": _spans_as_text,
+}
+
+
+def synthetic_corpus(mb: float, seed: int = 0) -> list[str]:
+    """Pages of random words: mostly normal paragraphs, some oversized ones."""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    pages, size = [], 0
+    while size < mb * (1 << 20):
+        paras = [
+            " ".join(rng.choices(vocab, k=rng.choice((20, 60, 120, 250, 900)))) + "."
+            for _ in range(rng.randint(5, 40))
+        ]
+        pages.append("\n\n".join(paras))
+        size += len(pages[-1])
+    return pages
+
+
+def _run(chunker: Callable[[str], list], pages: list[str]) -> int:
+    return sum(len(chunker(page)) for page in pages)
+
+
+def chunker_report(pages: list[str], repeat: int = 1) -> list[dict]:
+    size_mb = sum(len(p) for p in pages) / (1 << 20)
+    rows = []
+    for name, chunker in CHUNKERS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            chunks = _run(chunker, pages)
+        seconds = (time.perf_counter() - start) / repeat
+
+        tracemalloc.start()
+        _run(chunker, pages[: max(1, len(pages) // 10)])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append(
+            {
+                "chunker": name,
+                "seconds": seconds,
+                "mb_per_s": size_mb / seconds if seconds > 0 else 0.0,
+                "chunks": chunks,
+                "peak_mb": peak / (1 << 20),
+            }
+        )
+    return rows
+
+
+def same_chunks(pages: list[str]) -> bool:
+    for page in pages:
+        old = [c.split() for c in make_chunks(page)]
+        new = [page[s:e].split() for s, e in word_chunk_spans(page)]
+        if old != new:
+            return False
+    return True
+
+
+def format_report(rows: list[dict]) -> str:
+    lines = [f"{'chunker':<18}{'seconds':>9}{'MB/s':>8}{'chunks':>9}{'peak MB*':>10}"]
+    for r in rows:
+        lines.append(
+            f"{r['chunker']:<18}{r['seconds']:>9.2f}{r['mb_per_s']:>8.1f}"
+            f"{r['chunks']:>9}{r['peak_mb']:>10.1f}"
+        )
+    lines.append("* traced allocations while chunking a tenth of the pages")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help=".txt files or directories of them")
+    parser.add_argument("--synthetic-mb", type=float, default=0.0, help="use N MB of generated text")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.synthetic_mb:
+        pages = synthetic_corpus(args.synthetic_mb)
+    else:
+        files = text_files(args.paths or [raw_text_dir(), raw_web_dir()])
+        pages = [f.read_text(encoding="utf-8") for f in files]
+        if not pages:
+            pages = synthetic_corpus(20)
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / (1 << 20):.1f} MB")
+    print(format_report(chunker_report(pages, repeat=max(1, args.repeat))))
+    print("same chunks:", "yes" if same_chunks(pages) else "NO")
+
+
+if __name__ == "__main__":
+    main()
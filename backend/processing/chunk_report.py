@@ -0,0 +1,95 @@
+"""How much of each chunk the embedding model never sees, per chunk mode.
+
+    python -m backend.processing.chunk_report                  # data/raw text caches
+    python -m backend.processing.chunk_report notes.txt docs/
+
+The model embeds at most `embedder.max_tokens()` word-piece tokens of each
+chunk; everything after that is truncated.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+
+from backend.embeddings import embedder
+from backend.processing.chunker import chunk_text
+from backend.utils.paths import raw_text_dir, raw_web_dir, text_files
+
+MODES = ("words", "tokens")
+
+
+@dataclass(frozen=True)
+class TruncationStats:
+    chunks: int
+    tokens: int
+    max_tokens: int
+    truncated_chunks: int
+    truncated_tokens: int
+
+    @property
+    def tokens_per_chunk(self) -> float:
+        return self.tokens / self.chunks if self.chunks else 0.0
+
+    @property
+    def truncated_per_chunk(self) -> float:
+        return self.truncated_tokens / self.chunks if self.chunks else 0.0
+
+    @property
+    def truncated_fraction(self) -> float:
+        return self.truncated_tokens / self.tokens if self.tokens else 0.0
+
+
+def truncation_stats(chunks: list[str], tokenizer=None, window: int | None = None) -> TruncationStats:
+    """Token counts of `chunks` against the model window (defaults: the embedding model's)."""
+    tokenizer = tokenizer or embedder.tokenizer()
+    window = window or embedder.max_tokens()
+    lengths = (
+        [len(ids) for ids in tokenizer(chunks, add_special_tokens=False, verbose=False)["input_ids"]]
+        if chunks
+        else []
+    )
+    over = [n - window for n in lengths if n > window]
+    return TruncationStats(
+        chunks=len(lengths),
+        tokens=sum(lengths),
+        max_tokens=max(lengths, default=0),
+        truncated_chunks=len(over),
+        truncated_tokens=sum(over),
+    )
+
+
+def format_report(report: dict[str, TruncationStats], window: int) -> str:
+    lines = [
+        f"model window: {window} tokens",
+        f"{'mode':<8}{'chunks':>8}{'tok/chunk':>11}{'max':>7}{'truncated':>11}"
+        f"{'cut tok/chunk':>15}{'lost':>8}",
+    ]
+    for mode, s in report.items():
+        lines.append(
+            f"{mode:<8}{s.chunks:>8}{s.tokens_per_chunk:>11.1f}{s.max_tokens:>7}"
+            f"{s.truncated_chunks:>11}{s.truncated_per_chunk:>15.1f}{s.truncated_fraction:>8.1%}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help=".txt files or directories of them")
+    args = parser.parse_args()
+
+    files = text_files(args.paths or [raw_text_dir(), raw_web_dir()])
+    if not files:
+        parser.error("no .txt files found")
+    texts = [f.read_text(encoding="utf-8") for f in files]
+
+    report = {
+        mode: truncation_stats([c for text in texts for c in chunk_text(text, mode)]) for mode in MODES
+    }
+    print(f"{len(files)} files")
+    print(format_report(report, embedder.max_tokens()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,28 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import NamedTuple
+
+import numpy as np
+
+from backend.config import CHUNK_MODE, CHUNK_OVERLAP_TOKENS
+from backend.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
 MAX_WORDS = 400
 OVERLAP_WORDS = 80
 
+# 1 for each code point up to U+3001 that `str.split` treats as whitespace;
+# none above U+3000 is, so larger code points are looked up as U+3001.
+_SPACE_TABLE = np.array([chr(c).isspace() for c in range(0x3002)], dtype=np.int8)
+
+
+class Chunk(NamedTuple):
+    start: int
+    end: int
+    text: str
+
 
 def count_words(a):
     return len(a.split())
@@ -86,6 +108,212 @@ def make_chunks(a):
     return res
 
 
+def _strip_span(text: str, start: int, end: int) -> tuple[int, int] | None:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if end > start else None
+
+
+def paragraph_spans(text: str) -> list[tuple[int, int]]:
+    """(start, end) offsets of the paragraphs `make_paragraphs` would return.
+
+    Blank-line separated blocks; if there is only one, runs of lines that end
+    in "." or ":". The spans index into `text`, so line breaks inside a
+    paragraph are kept rather than joined with spaces.
+    """
+    spans = []
+    pos = 0
+    for part in text.split("\n\n"):
+        span = _strip_span(text, pos, pos + len(part))
+        if span:
+            spans.append(span)
+        pos += len(part) + 2
+    if len(spans) > 1:
+        return spans
+
+    spans = []
+    start = None
+    pos = 0
+    for line in text.split("\n"):
+        span = _strip_span(text, pos, pos + len(line))
+        pos += len(line) + 1
+        if span is None:
+            continue
+        if start is None:
+            start = span[0]
+        if text[span[1] - 1] in ".:":
+            spans.append((start, span[1]))
+            start = None
+    if start is not None:
+        spans.append((start, _strip_span(text, start, len(text))[1]))
+    return spans
+
+
+def token_chunk_spans(
+    text: str, tokenizer, max_tokens: int, overlap: int = CHUNK_OVERLAP_TOKENS
+) -> list[tuple[int, int]]:
+    """Chunk `text` into (start, end) spans of at most `max_tokens` tokens.
+
+    Like `make_chunks`, but counted in `tokenizer`'s tokens: whole paragraphs
+    are packed into a chunk while they fit, each chunk after the first starts
+    with the last `overlap` tokens of the one before, and a paragraph longer
+    than the window is cut into overlapping windows. Cuts fall between words.
+    The text is tokenized once; `tokenizer` must be a fast (offset-mapping)
+    Hugging Face tokenizer.
+    """
+    offsets = tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+    )["offset_mapping"]
+    starts = [s for s, _ in offsets]
+    overlap = max(0, min(overlap, max_tokens // 2))
+
+    def word_start(i: int) -> bool:
+        return i == 0 or i >= len(offsets) or offsets[i][0] > offsets[i - 1][1]
+
+    def back_to_word(i: int, lo: int) -> int:
+        j = i
+        while j > lo and not word_start(j):
+            j -= 1
+        return j if j > lo else i
+
+    def on_to_word(i: int, hi: int) -> int:
+        while i < hi and not word_start(i):
+            i += 1
+        return i
+
+    spans: list[tuple[int, int]] = []
+
+    def emit(ts: int, te: int) -> None:
+        spans.append((offsets[ts][0], offsets[te - 1][1]))
+
+    chunk: tuple[int, int] | None = None  # token range of the chunk being filled
+    for ps, pe in paragraph_spans(text):
+        ts, te = bisect_left(starts, ps), bisect_left(starts, pe)
+        if te <= ts:
+            continue
+
+        if te - ts > max_tokens:
+            if chunk:
+                emit(*chunk)
+                chunk = None
+            i = ts
+            while True:
+                end = te if te - i <= max_tokens else back_to_word(i + max_tokens, i)
+                emit(i, end)
+                if end >= te:
+                    break
+                # A window cut back to a word boundary can be shorter than the
+                # overlap (short words before one huge token run, e.g. a URL or
+                # base64 blob); then the next one starts where it ended.
+                i = end if end - i <= overlap else on_to_word(end - overlap, end)
+            continue
+
+        if chunk is None:
+            chunk = (ts, te)
+        elif te - chunk[0] <= max_tokens:
+            chunk = (chunk[0], te)
+        else:
+            emit(*chunk)
+            carry = min(overlap, max_tokens - (te - ts))
+            chunk = (on_to_word(ts - carry, ts) if carry > 0 else ts, te)
+    if chunk:
+        emit(*chunk)
+    return spans
+
+
+def word_offsets(text: str) -> tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of the words `text.split()` would return."""
+    if text.isascii():
+        codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    else:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        codes = np.minimum(codes, len(_SPACE_TABLE) - 1)
+    space = np.empty(len(codes) + 2, dtype=np.int8)
+    space[0] = space[-1] = 1
+    space[1:-1] = _SPACE_TABLE[codes]
+    edges = np.flatnonzero(np.diff(space))
+    return edges[0::2], edges[1::2]
+
+
+def word_chunk_spans(
+    text: str, max_words: int = MAX_WORDS, overlap: int = OVERLAP_WORDS
+) -> list[tuple[int, int]]:
+    """`make_chunks` as (start, end) spans into `text`, in linear time.
+
+    Word offsets are found once, vectorized; paragraphs, chunks and overlaps
+    are then ranges of word indexes, so nothing is re-split or re-joined. The
+    chunks hold the same words as `make_chunks`'s, with the source's own
+    whitespace between them.
+    """
+    starts, ends = word_offsets(text)
+    # Word index just past each paragraph.
+    bounds = np.searchsorted(starts, [pe for _, pe in paragraph_spans(text)]).tolist()
+
+    spans: list[tuple[int, int]] = []
+
+    def emit(ws: int, we: int) -> None:
+        spans.append((int(starts[ws]), int(ends[we - 1])))
+
+    step = max(1, max_words - overlap)
+    chunk: tuple[int, int] | None = None  # word range of the chunk being filled
+    for first, end in zip([0] + bounds, bounds):
+        if end == first:
+            continue
+
+        if end - first > max_words:
+            if chunk:
+                emit(*chunk)
+                chunk = None
+            for i in range(first, end, step):
+                emit(i, min(i + max_words, end))
+            continue
+
+        if chunk is None:
+            chunk = (first, end)
+        elif chunk[1] - chunk[0] + end - first <= max_words:
+            chunk = (chunk[0], end)
+        else:
+            emit(*chunk)
+            chunk = (max(chunk[0], chunk[1] - overlap), end)
+    if chunk:
+        emit(*chunk)
+    return spans
+
+
+_warned_slow_tokenizer = False
+
+
+def _model_token_spans(text: str) -> list[tuple[int, int]]:
+    global _warned_slow_tokenizer
+    from backend.embeddings import embedder  # imported here: loads the model stack
+
+    tokenizer = embedder.tokenizer()
+    if not getattr(tokenizer, "is_fast", False):
+        if not _warned_slow_tokenizer:
+            logger.warning("tokenizer has no offset mapping; chunking by words instead")
+            _warned_slow_tokenizer = True
+        return word_chunk_spans(text)
+    return token_chunk_spans(text, tokenizer, embedder.max_tokens())
+
+
+def chunk_spans(text: str, mode: str | None = None) -> list[Chunk]:
+    """Chunk with `mode` ("tokens" or "words"), defaulting to RAG_CHUNK_MODE."""
+    mode = (mode or CHUNK_MODE).strip().lower()
+    if mode == "tokens":
+        spans = _model_token_spans(text)
+    elif mode == "words":
+        spans = word_chunk_spans(text)
+    else:
+        raise ValueError(f"Unknown chunk mode {mode!r}; expected 'tokens' or 'words'.")
+    return [Chunk(s, e, text[s:e]) for s, e in spans]
+
+
+def chunk_text(text: str, mode: str | None = None) -> list[str]:
+    return [c.text for c in chunk_spans(text, mode)]
+
+
 if __name__ == "__main__":
     with open("data/raw/raw_text/google_sre.txt", "r", encoding="utf-8") as f:
         text = f.read()
@@ -0,0 +1,146 @@
+"""Near-duplicate detection for chunks with MinHash signatures and LSH.
+
+A chunk's signature is the minimum, under NUM_PERM hash functions, of the
+mmh3 hashes of its word 5-shingles; the fraction of equal positions in two
+signatures estimates the Jaccard similarity of their shingle sets. Signatures
+are banded (LSH) so a lookup only compares against chunks that share a
+band, not against everything seen so far.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+import re
+from typing import Any
+
+import mmh3
+import numpy as np
+
+from backend.config import NEAR_DUP_THRESHOLD
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hash family: h(x) = ((a * x + b) mod 2**64) >> 32, a odd.
+_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """mmh3 hashes of the lower-cased word k-shingles of `text`."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= k:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i : i + k]) for i in range(len(words) - k + 1)]
+    return np.fromiter((mmh3.hash(g, signed=False) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(text: str) -> np.ndarray:
+    """The (NUM_PERM,) uint32 MinHash signature of `text`."""
+    hashes = np.unique(shingle_hashes(text))
+    with np.errstate(over="ignore"):
+        mixed = (hashes[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return mixed.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    duplicates: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.duplicates / self.chunks if self.chunks else 0.0
+
+
+class NearDuplicateIndex:
+    """Signatures seen so far, looked up by LSH band."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[defaultdict[bytes, list[int]]] = [defaultdict(list) for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, signature: np.ndarray) -> Iterator[tuple[int, bytes]]:
+        for band in range(BANDS):
+            yield band, signature[band * ROWS : (band + 1) * ROWS].tobytes()
+
+    def find(self, signature: np.ndarray) -> int | None:
+        """Position of the most similar stored signature at or above the threshold."""
+        candidates = {i for band, key in self._bands(signature) for i in self._buckets[band].get(key, ())}
+        best, best_sim = None, self.threshold
+        for i in candidates:
+            sim = similarity(signature, self._signatures[i])
+            if sim >= best_sim:
+                best, best_sim = i, sim
+        return best
+
+    def add(self, signature: np.ndarray) -> int:
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in self._bands(signature):
+            self._buckets[band][key].append(position)
+        return position
+
+
+def drop_near_duplicates(
+    records: Iterable[dict[str, Any]],
+    stats: DedupStats | None = None,
+    threshold: float = NEAR_DUP_THRESHOLD,
+) -> Iterator[dict[str, Any]]:
+    """Yield the records whose text is not a near-duplicate of an earlier one.
+
+    Meant for the chunks of one document: repeated page headers/footers and
+    boilerplate blocks are embedded once. A threshold of 0 (or less) keeps
+    everything.
+    """
+    stats = stats if stats is not None else DedupStats()
+    index = NearDuplicateIndex(threshold)
+    for record in records:
+        stats.chunks += 1
+        if threshold > 0:
+            signature = minhash(record["text"])
+            if index.find(signature) is not None:
+                stats.duplicates += 1
+                continue
+            index.add(signature)
+        yield record
+
+
+def collapse(records: list[dict[str, Any]], threshold: float = NEAR_DUP_THRESHOLD) -> list[int]:
+    """Positions of the records to keep, in order; later near-duplicates are dropped.
+
+    Each kept record gets the sources of the records folded into it under
+    "also_in".
+    """
+    index = NearDuplicateIndex(threshold)
+    kept: list[int] = []
+    for position, record in enumerate(records):
+        signature = minhash(record["text"])
+        match = index.find(signature) if threshold > 0 else None
+        if match is None:
+            index.add(signature)
+            kept.append(position)
+            continue
+        canonical = records[kept[match]]
+        source = record.get("source")
+        if source and source != canonical.get("source"):
+            also_in = canonical.setdefault("also_in", [])
+            if source not in also_in:
+                also_in.append(source)
+    return kept
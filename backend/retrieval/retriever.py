@@ -1,19 +1,69 @@
 from __future__ import annotations
 
-from backend.embeddings.vector_store import search
+from backend.config import NEAR_DUP_THRESHOLD, RETRIEVAL_MODE
+from backend.embeddings.vector_store import SearchFilter, hybrid_search_many, search_many
+from backend.processing.near_dup import collapse
 
 
 def _distance_to_similarity(distance: float) -> float:
-	# FAISS IndexFlatL2 returns squared L2 distances (smaller is better).
+	# FAISS L2 indexes (flat, IVF, HNSW) return squared L2 distances (smaller is better).
 	# Map to (0, 1] for downstream confidence heuristics.
 	return 1.0 / (1.0 + max(0.0, float(distance)))
 
 
-def retrieve_chunks(query: str, top_k: int = 5):
-	"""Return (records, similarity_scores)."""
-	records, distances = search(query, top_k=top_k)
-	similarity_scores = [_distance_to_similarity(d) for d in distances]
-	return records, similarity_scores
+def _search_many(queries: list[str], top_k: int, mode: str, where: SearchFilter | None):
+	if mode == "hybrid":
+		return hybrid_search_many(queries, top_k=top_k, where=where)
+	if mode == "dense":
+		return search_many(queries, top_k=top_k, where=where)
+	raise ValueError(f"Unknown retrieval mode {mode!r}; expected 'hybrid' or 'dense'.")
 
 
-__all__ = ["retrieve_chunks"]
+def retrieve_chunks(
+	query: str,
+	top_k: int = 5,
+	distinct: bool = True,
+	mode: str | None = None,
+	where: SearchFilter | None = None,
+):
+	"""Return (records, similarity_scores).
+
+	`where` restricts retrieval to records matching a `SearchFilter` (file,
+	url, type, doc_id, page range).
+
+	`mode` is "hybrid" (BM25 and dense rankings fused, the default via
+	RAG_RETRIEVAL_MODE) or "dense". Records come in ranked order; their scores
+	are always the dense similarity to the query.
+
+	With `distinct`, twice as many hits are fetched and near-duplicates of a
+	better hit are folded into it (their sources listed under "also_in"), so
+	the top_k carry distinct context.
+	"""
+	return retrieve_many([query], top_k=top_k, distinct=distinct, mode=mode, where=where)[0]
+
+
+def retrieve_many(
+	queries: list[str],
+	top_k: int = 5,
+	distinct: bool = True,
+	mode: str | None = None,
+	where: SearchFilter | None = None,
+):
+	"""`retrieve_chunks` for each query, in input order, as one batch.
+
+	All queries are embedded in one model call and searched with one batched
+	index search.
+	"""
+	mode = mode or RETRIEVAL_MODE
+	distinct = distinct and NEAR_DUP_THRESHOLD > 0
+	results = []
+	for records, distances in _search_many(list(queries), 2 * top_k if distinct else top_k, mode, where):
+		if distinct:
+			keep = collapse(records)[:top_k]
+			records = [records[i] for i in keep]
+			distances = [distances[i] for i in keep]
+		results.append((records, [_distance_to_similarity(d) for d in distances]))
+	return results
+
+
+__all__ = ["SearchFilter", "retrieve_chunks", "retrieve_many"]
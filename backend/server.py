@@ -0,0 +1,198 @@
+"""HTTP service for questions and ingestion over one warm model and index.
+
+Each worker process loads the embedding model and maps the vector store
+once, at startup, and serves every request from them:
+
+    python -m backend.server --host 0.0.0.0 --port 8000 --workers 4
+    uvicorn backend.server:app --workers 4
+
+Workers share the data directory: ingestion in one is picked up by the
+others' resident stores on their next search. Ingests of the same document
+run one after another within a worker; across workers the second is refused
+with 409 while the first is still writing. Every response carries a
+`Server-Timing` header (total, and for /ask the retrieval and LLM stages)
+and `X-Process-Time` in seconds.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+import time
+import weakref
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+from backend.config import SERVER_MAX_BATCH
+from backend.embeddings import embedder
+from backend.embeddings.doc_registry import pdf_doc_id, web_doc_id
+from backend.embeddings.vector_store import DocumentBusyError, get_store, has_index
+from backend.ui_api import (
+    IngestResult,
+    SearchFilter,
+    aask_many,
+    ingest_pdf_bytes,
+    ingest_url,
+    pdf_file_name,
+)
+from backend.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Filter(BaseModel):
+    file: list[str] = []
+    url: list[str] = []
+    type: list[str] = []
+    doc_id: list[str] = []
+    page_min: int | None = None
+    page_max: int | None = None
+
+    def to_search_filter(self) -> SearchFilter:
+        return SearchFilter(
+            file=tuple(self.file),
+            url=tuple(self.url),
+            type=tuple(self.type),
+            doc_id=tuple(self.doc_id),
+            page_min=self.page_min,
+            page_max=self.page_max,
+        )
+
+
+class AskRequest(BaseModel):
+    question: str
+    top_k: int = Field(5, ge=1, le=50)
+    filter: Filter | None = None
+
+
+class AskBatchRequest(BaseModel):
+    questions: list[str] = Field(..., max_length=SERVER_MAX_BATCH)
+    top_k: int = Field(5, ge=1, le=50)
+    filter: Filter | None = None
+
+
+class IngestUrlRequest(BaseModel):
+    url: str
+
+
+def _warm_up() -> None:
+    embedder.encode_query("warm up")
+    if has_index():
+        logger.info("serving %d chunks", len(get_store()))
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    start = time.perf_counter()
+    await asyncio.to_thread(_warm_up)
+    logger.info("model and index loaded in %.2fs", time.perf_counter() - start)
+    yield
+
+
+app = FastAPI(title="RAG QA Engine", lifespan=_lifespan)
+
+
+@app.middleware("http")
+async def _timing_headers(request: Request, call_next) -> Response:
+    start = time.perf_counter()
+    response = await call_next(request)
+    seconds = time.perf_counter() - start
+    stages = [f"{name};dur={ms:.1f}" for name, ms in getattr(request.state, "timings", {}).items()]
+    response.headers["Server-Timing"] = ", ".join([*stages, f"total;dur={seconds * 1000:.1f}"])
+    response.headers["X-Process-Time"] = f"{seconds:.4f}"
+    return response
+
+
+@app.exception_handler(FileNotFoundError)
+async def _no_index(request: Request, exc: FileNotFoundError) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+def _where(f: Filter | None) -> SearchFilter | None:
+    return f.to_search_filter() if f is not None else None
+
+
+# One lock per document being ingested, dropped once no request holds it.
+_ingest_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+
+async def _ingest(doc_id: str, func, *args) -> JSONResponse:
+    """Run an ingest function off the event loop, one at a time per document.
+
+    A retried or duplicate request waits for the first and then finds the
+    document unchanged. Failures become 422 responses, and a document held
+    by another worker's ingest a 409.
+    """
+    lock = _ingest_locks.setdefault(doc_id, asyncio.Lock())
+    async with lock:
+        try:
+            result = await asyncio.to_thread(func, *args)
+        except DocumentBusyError as e:
+            return JSONResponse(status_code=409, content={"detail": str(e)})
+        except Exception as e:
+            logger.exception("ingest failed")
+            result = IngestResult(ok=False, message=f"Could not ingest: {e}")
+    return JSONResponse(status_code=200 if result.ok else 422, content=asdict(result))
+
+
+@app.get("/health")
+def health() -> dict:
+    indexed = has_index()
+    return {
+        "status": "ok",
+        "model": embedder.MODEL_NAME,
+        "index": indexed,
+        "chunks": len(get_store()) if indexed else 0,
+    }
+
+
+@app.post("/ask")
+async def ask(body: AskRequest, request: Request) -> dict:
+    if not body.question.strip():
+        raise HTTPException(status_code=422, detail="question is empty")
+    (result,) = await aask_many([body.question], top_k=body.top_k, where=_where(body.filter))
+    timings = result.pop("timings")
+    request.state.timings = {name: timings[name] * 1000 for name in ("retrieval", "llm")}
+    return result
+
+
+@app.post("/ask/batch")
+async def ask_batch(body: AskBatchRequest) -> dict:
+    """Answers in input order, each with its "timings"."""
+    results = await aask_many(body.questions, top_k=body.top_k, where=_where(body.filter))
+    return {"results": results}
+
+
+@app.post("/ingest/pdf")
+async def ingest_pdf(
+    request: Request, filename: str = Query(..., description="name to store the PDF under")
+) -> JSONResponse:
+    """Ingest the raw PDF bytes of the request body (Content-Type: application/pdf)."""
+    data = await request.body()
+    if not data:
+        raise HTTPException(status_code=422, detail="request body is empty")
+    return await _ingest(pdf_doc_id(pdf_file_name(filename)), ingest_pdf_bytes, filename, data)
+
+
+@app.post("/ingest/url")
+async def ingest_web_page(body: IngestUrlRequest) -> JSONResponse:
+    return await _ingest(web_doc_id(body.url.strip()), ingest_url, body.url)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own warm model")
+    args = parser.parse_args()
+    uvicorn.run("backend.server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-
-from backend.embeddings.vector_store import add_records, clear_index, has_index
+import time
+
+from backend.config import LLM_CONCURRENCY
+from backend.embeddings.doc_registry import content_hash, pdf_doc_id, web_doc_id
+from backend.embeddings.vector_store import (
+    clear_index,
+    delete_document,
+    document_status,
+    has_index,
+    list_documents,
+)
 from backend.evaluation.answer_evaluator import evaluate_answer
 from backend.evaluation.source_attribution import extract_sources
-from backend.ingestion.pdf_loader import load_pdf_pages
+from backend.ingestion import pipeline
+from backend.ingestion.bulk import bulk_ingest
+from backend.ingestion.crawler import CrawlOptions
+from backend.ingestion.pdf_loader import file_hash
 from backend.ingestion.text_cleaner import normalize_text
 from backend.ingestion.web_cache_loader import get_web_text
 from backend.llm.answer_guard import guard_answer
-from backend.llm.llm_client import generate_answer
+from backend.llm.llm_client import agenerate_answer, generate_answer
 from backend.llm.prompt_builder import build_prompt, format_context
-from backend.processing.chunker import make_chunks
-from backend.retrieval.retriever import retrieve_chunks
-from backend.utils.paths import raw_pdfs_dir, raw_text_dir
+from backend.retrieval.retriever import SearchFilter, retrieve_chunks, retrieve_many
+from backend.utils.logger import get_logger
+from backend.utils.paths import raw_pdfs_dir
+
+logger = get_logger(__name__)
 
 
 @dataclass(frozen=True)
@@ -25,14 +41,18 @@ class IngestResult:
     stored_as: str | None = None
 
 
-def ingest_pdf_bytes(filename: str, data: bytes) -> IngestResult:
-    raw_pdfs_dir().mkdir(parents=True, exist_ok=True)
-
+def pdf_file_name(filename: str) -> str:
+    """The name an uploaded PDF is stored (and identified) under."""
     safe_name = Path(filename).name
     if not safe_name.lower().endswith(".pdf"):
         safe_name = f"{safe_name}.pdf"
+    return safe_name
+
+
+def ingest_pdf_bytes(filename: str, data: bytes) -> IngestResult:
+    raw_pdfs_dir().mkdir(parents=True, exist_ok=True)
 
-    dest = raw_pdfs_dir() / safe_name
+    dest = raw_pdfs_dir() / pdf_file_name(filename)
     dest.write_bytes(data)
 
     return ingest_pdf_path(dest)
@@ -43,39 +63,23 @@ def ingest_pdf_path(pdf_path: str | Path) -> IngestResult:
     if not pdf_path.exists() or not pdf_path.is_file():
         return IngestResult(ok=False, message=f"PDF not found: {pdf_path}")
 
-    pages = load_pdf_pages(str(pdf_path))
-    if not pages:
+    doc_id = pdf_doc_id(pdf_path.name)
+    doc_hash = file_hash(pdf_path)
+    if document_status(doc_id, doc_hash) == "unchanged":
+        return IngestResult(
+            ok=True,
+            message=f"Already ingested (unchanged): {pdf_path.name}",
+            stored_as=pdf_path.name,
+        )
+
+    # Pages are chunked, embedded and stored in batches as they are extracted.
+    chunks = pipeline.ingest_pdf(pdf_path, doc_id, doc_hash)
+    if chunks == 0:
         return IngestResult(ok=False, message="No extractable text found in the PDF.")
-
-    raw_text_dir().mkdir(parents=True, exist_ok=True)
-
-    combined_text = "\n\n".join(p["text"] for p in pages)
-    combined_text = normalize_text(combined_text)
-    (raw_text_dir() / f"{pdf_path.stem}.txt").write_text(combined_text, encoding="utf-8")
-
-    records: list[dict] = []
-    for p in pages:
-        page_num = int(p["page"])
-        page_text = normalize_text(p["text"])
-        if not page_text:
-            continue
-
-        for chunk in make_chunks(page_text):
-            records.append(
-                {
-                    "text": chunk,
-                    "type": "pdf",
-                    "file": pdf_path.name,
-                    "page": page_num,
-                    "source": f"{pdf_path.name} (page {page_num})",
-                }
-            )
-
-    add_records(records)
     return IngestResult(
         ok=True,
         message=f"Ingested PDF: {pdf_path.name}",
-        chunks_added=len(records),
+        chunks_added=chunks or 0,
         stored_as=pdf_path.name,
     )
 
@@ -90,41 +94,64 @@ def ingest_url(url: str) -> IngestResult:
     if not text:
         return IngestResult(ok=False, message="No extractable text found on the page.")
 
-    records = [
-        {"text": chunk, "type": "web", "url": url, "source": url}
-        for chunk in make_chunks(text)
-    ]
+    doc_id = web_doc_id(url)
+    doc_hash = content_hash(text)
+    if document_status(doc_id, doc_hash) == "unchanged":
+        return IngestResult(ok=True, message=f"Already ingested (unchanged): {url}")
 
-    add_records(records)
-    return IngestResult(ok=True, message=f"Ingested URL: {url}", chunks_added=len(records))
+    chunks = pipeline.ingest_web_text(url, text, doc_id, doc_hash)
+    return IngestResult(ok=True, message=f"Ingested URL: {url}", chunks_added=chunks or 0)
 
 
-def ask(query: str, top_k: int = 5) -> dict:
-    query = (query or "").strip()
-    if not query:
-        return {"answer": "", "confidence": 0.0, "sources": []}
+def ingest_site(url: str, max_depth: int = 2, max_pages: int = 50) -> IngestResult:
+    """Crawl the site from `url` and ingest each page as it is fetched."""
+    url = (url or "").strip()
+    if not (url.startswith("http://") or url.startswith("https://")):
+        return IngestResult(ok=False, message="Please enter a valid http(s) URL.")
+
+    summary = bulk_ingest(
+        sites=[url], crawl_options=CrawlOptions(max_depth=max_depth, max_pages=max_pages)
+    )
+    if not summary.ingested and not summary.unchanged:
+        return IngestResult(ok=False, message=f"No pages with extractable text found from {url}.")
+    return IngestResult(
+        ok=True,
+        message=(
+            f"Crawled {url}: {summary.ingested} pages ingested, {summary.unchanged} unchanged,"
+            f" {summary.duplicates} duplicates, {len(summary.failed)} failed"
+        ),
+        chunks_added=summary.stage("store").chunks,
+    )
 
-    retrieved_chunks, similarity_scores = retrieve_chunks(query, top_k=top_k)
 
-    if not retrieved_chunks:
-        return {
-            "answer": "No relevant information found in the knowledge base.",
-            "confidence": 0.0,
-            "sources": [],
-        }
+def _no_context() -> dict:
+    return {
+        "answer": "No relevant information found in the knowledge base.",
+        "confidence": 0.0,
+        "sources": [],
+    }
 
-    context_text = format_context([c["text"] for c in retrieved_chunks])
-    prompt = build_prompt(context_text, query)
 
-    try:
-        raw_answer = generate_answer(prompt)
-    except RuntimeError as e:
-        return {
-            "answer": f"LLM not configured.\n{e}",
-            "confidence": 0.0,
-            "sources": extract_sources(retrieved_chunks),
-        }
+def _llm_unavailable(error: RuntimeError, retrieved_chunks: list[dict]) -> dict:
+    return {
+        "answer": f"LLM not configured.\n{error}",
+        "confidence": 0.0,
+        "sources": extract_sources(retrieved_chunks),
+    }
+
+
+def _llm_failed(error: Exception, retrieved_chunks: list[dict]) -> dict:
+    """The result for one question of a batch whose answer could not be generated."""
+    return {
+        "answer": f"LLM request failed: {error}",
+        "confidence": 0.0,
+        "sources": extract_sources(retrieved_chunks),
+    }
+
 
+def _finish(
+    raw_answer: str, context_text: str, retrieved_chunks: list[dict], similarity_scores: list[float]
+) -> dict:
     final_answer = guard_answer(raw_answer, context_present=True)
 
     confidence = evaluate_answer(
@@ -136,12 +163,167 @@ def ask(query: str, top_k: int = 5) -> dict:
     return {"answer": final_answer, "confidence": confidence, "sources": sources}
 
 
+def _answer(query: str, retrieved_chunks: list[dict], similarity_scores: list[float]) -> dict:
+    """Generate, guard and score the answer to `query` from its retrieved chunks."""
+    if not retrieved_chunks:
+        return _no_context()
+
+    context_text = format_context([c["text"] for c in retrieved_chunks])
+    try:
+        raw_answer = generate_answer(build_prompt(context_text, query))
+    except RuntimeError as e:
+        return _llm_unavailable(e, retrieved_chunks)
+    return _finish(raw_answer, context_text, retrieved_chunks, similarity_scores)
+
+
+async def _aanswer(query: str, retrieved_chunks: list[dict], similarity_scores: list[float]) -> dict:
+    """`_answer` with the LLM call awaited on the async client; a failed call
+    gives an error answer rather than raising."""
+    if not retrieved_chunks:
+        return _no_context()
+
+    context_text = format_context([c["text"] for c in retrieved_chunks])
+    try:
+        raw_answer = await agenerate_answer(build_prompt(context_text, query))
+    except RuntimeError as e:
+        return _llm_unavailable(e, retrieved_chunks)
+    except Exception as e:
+        # Under `gather` one failed call would otherwise fail the whole batch.
+        logger.exception("answer failed for %r", query)
+        return _llm_failed(e, retrieved_chunks)
+    return _finish(raw_answer, context_text, retrieved_chunks, similarity_scores)
+
+
+def ask(query: str, top_k: int = 5, where: SearchFilter | None = None) -> dict:
+    """Answer `query` from the knowledge base, optionally only from records matching `where`."""
+    query = (query or "").strip()
+    if not query:
+        return {"answer": "", "confidence": 0.0, "sources": []}
+
+    retrieved_chunks, similarity_scores = retrieve_chunks(query, top_k=top_k, where=where)
+    return _answer(query, retrieved_chunks, similarity_scores)
+
+
+def _blank_result() -> dict:
+    """The result for an empty question in a batch."""
+    return {
+        "answer": "",
+        "confidence": 0.0,
+        "sources": [],
+        "timings": {"retrieval": 0.0, "llm": 0.0, "total": 0.0},
+    }
+
+
+def ask_many(
+    queries: list[str],
+    top_k: int = 5,
+    where: SearchFilter | None = None,
+    max_workers: int = LLM_CONCURRENCY,
+) -> list[dict]:
+    """Answer several questions; results are `ask` dicts in input order.
+
+    Retrieval runs once for the whole batch (one `encode` call, one batched
+    index search); the LLM calls then run on at most `max_workers` threads.
+    A question whose LLM call fails gets an answer naming the error instead
+    of failing the batch. Each result also has "timings" in seconds:
+    "retrieval" (the shared batch retrieval), "llm" (this question's answer
+    generation) and "total" (from the start of the batch until this answer
+    was ready).
+    """
+    start = time.perf_counter()
+    queries = [(q or "").strip() for q in queries]
+    asked = [i for i, q in enumerate(queries) if q]
+    retrieved = retrieve_many([queries[i] for i in asked], top_k=top_k, where=where)
+    retrieval_seconds = time.perf_counter() - start
+
+    def _timed(query: str, chunks: list[dict], scores: list[float]) -> dict:
+        llm_start = time.perf_counter()
+        try:
+            result = _answer(query, chunks, scores)
+        except Exception as e:
+            # One failed call (rate limit, timeout) must not lose the rest of the batch.
+            logger.exception("answer failed for %r", query)
+            result = _llm_failed(e, chunks)
+        end = time.perf_counter()
+        result["timings"] = {
+            "retrieval": retrieval_seconds,
+            "llm": end - llm_start,
+            "total": end - start,
+        }
+        return result
+
+    results = [_blank_result() for _ in queries]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ask") as pool:
+        futures = {
+            pool.submit(_timed, queries[i], chunks, scores): i
+            for i, (chunks, scores) in zip(asked, retrieved, strict=True)
+        }
+        for future, i in futures.items():
+            results[i] = future.result()
+    return results
+
+
+async def aask(query: str, top_k: int = 5, where: SearchFilter | None = None) -> dict:
+    """`ask` for asyncio servers: the event loop is never blocked.
+
+    Embedding and search run on the default thread pool and the LLM call on
+    the async Groq client, at most RAG_LLM_CONCURRENCY at a time per event
+    loop, so one process can keep many questions in flight.
+    """
+    query = (query or "").strip()
+    if not query:
+        return {"answer": "", "confidence": 0.0, "sources": []}
+
+    retrieved_chunks, similarity_scores = await asyncio.to_thread(
+        retrieve_chunks, query, top_k=top_k, where=where
+    )
+    return await _aanswer(query, retrieved_chunks, similarity_scores)
+
+
+async def aask_many(queries: list[str], top_k: int = 5, where: SearchFilter | None = None) -> list[dict]:
+    """`ask_many` for asyncio servers: batched retrieval off the loop, then concurrent async LLM calls."""
+    start = time.perf_counter()
+    queries = [(q or "").strip() for q in queries]
+    asked = [i for i, q in enumerate(queries) if q]
+    retrieved = await asyncio.to_thread(
+        retrieve_many, [queries[i] for i in asked], top_k=top_k, where=where
+    )
+    retrieval_seconds = time.perf_counter() - start
+
+    async def _timed(query: str, chunks: list[dict], scores: list[float]) -> dict:
+        llm_start = time.perf_counter()
+        result = await _aanswer(query, chunks, scores)
+        end = time.perf_counter()
+        result["timings"] = {
+            "retrieval": retrieval_seconds,
+            "llm": end - llm_start,
+            "total": end - start,
+        }
+        return result
+
+    answers = await asyncio.gather(
+        *(_timed(queries[i], chunks, scores) for i, (chunks, scores) in zip(asked, retrieved, strict=True))
+    )
+    results = [_blank_result() for _ in queries]
+    for i, answer in zip(asked, answers, strict=True):
+        results[i] = answer
+    return results
+
+
 __all__ = [
     "IngestResult",
+    "SearchFilter",
+    "aask",
+    "aask_many",
     "ask",
+    "ask_many",
     "clear_index",
+    "delete_document",
     "has_index",
     "ingest_pdf_bytes",
     "ingest_pdf_path",
+    "ingest_site",
     "ingest_url",
+    "list_documents",
+    "pdf_file_name",
 ]
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import logging
+import os
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Module logger; level comes from RAG_LOG_LEVEL (default INFO)."""
+    logger = logging.getLogger(name)
+    if not logging.getLogger().handlers and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(os.getenv("RAG_LOG_LEVEL", "INFO").upper())
+    return logger
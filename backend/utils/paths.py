@@ -31,3 +31,18 @@ def raw_web_dir() -> Path:
 
 def vectors_dir() -> Path:
     return data_root() / "vectors"
+
+
+def cache_dir() -> Path:
+    return data_root() / "cache"
+
+
+def text_files(paths: list[Path]) -> list[Path]:
+    """The `.txt` files in `paths`: directories are listed, files taken as given."""
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.txt")))
+        elif path.exists():
+            files.append(path)
+    return files
@@ -2,7 +2,17 @@ from __future__ import annotations
 
 import streamlit as st
 
-from backend.ui_api import ask, clear_index, has_index, ingest_pdf_bytes, ingest_url
+from backend.ui_api import (
+    SearchFilter,
+    ask,
+    clear_index,
+    delete_document,
+    has_index,
+    ingest_pdf_bytes,
+    ingest_site,
+    ingest_url,
+    list_documents,
+)
 
 
 st.set_page_config(page_title="RAG QA Engine", layout="wide")
@@ -21,6 +31,14 @@ with st.sidebar:
         st.success("Vector data cleared.")
         st.rerun()
 
+    documents = list_documents()
+    if documents:
+        doc_id = st.selectbox("Documents", [d.doc_id for d in documents])
+        if st.button("Remove document", type="secondary"):
+            removed = delete_document(doc_id)
+            st.success(f"Removed {doc_id} (chunks: {removed})")
+            st.rerun()
+
     st.divider()
     st.subheader("Ingest PDF")
     uploaded = st.file_uploader("Upload a PDF", type=["pdf"], accept_multiple_files=False)
@@ -36,8 +54,12 @@ with st.sidebar:
     st.divider()
     st.subheader("Ingest URL")
     url = st.text_input("Web page URL")
+    crawl = st.checkbox("Crawl linked pages on the same site")
+    if crawl:
+        max_depth = st.number_input("Link depth", min_value=1, max_value=5, value=2)
+        max_pages = st.number_input("Max pages", min_value=1, max_value=1000, value=50)
     if st.button("Ingest URL"):
-        res = ingest_url(url)
+        res = ingest_site(url, int(max_depth), int(max_pages)) if crawl else ingest_url(url)
         if res.ok:
             st.success(f"{res.message} (chunks: {res.chunks_added})")
             st.rerun()
@@ -53,6 +75,7 @@ with col1:
 
 with col2:
     top_k = st.slider("Top-K", min_value=1, max_value=10, value=5, step=1)
+    only_docs = st.multiselect("Only these documents", [d.doc_id for d in list_documents()])
     ask_clicked = st.button("Get answer", type="primary", use_container_width=True)
 
 if ask_clicked:
@@ -62,7 +85,7 @@ if ask_clicked:
         st.warning("Type a question first.")
     else:
         with st.spinner("Retrieving and generating answer…"):
-            result = ask(question, top_k=top_k)
+            result = ask(question, top_k=top_k, where=SearchFilter(doc_id=tuple(only_docs)))
 
         st.markdown("### Answer")
         st.write(result.get("answer", ""))
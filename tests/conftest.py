@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from backend.utils import paths
+
+DIM = 8
+
+
+def fake_embed(texts: list[str]) -> np.ndarray:
+    """Deterministic stand-in for the embedding model: a vector per distinct text."""
+    out = np.empty((len(texts), DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        out[i] = np.random.default_rng(seed).standard_normal(DIM)
+    return out
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory, with the resident store and automatic maintenance reset."""
+    pytest.importorskip("faiss")
+    from backend.embeddings import embedder, vector_store
+    from backend.processing import chunker
+
+    monkeypatch.setattr(paths, "data_root", lambda: tmp_path)
+    monkeypatch.setattr(vector_store, "_STORE", None)
+    # Tests run compaction and reclaim themselves, not on a background thread.
+    monkeypatch.setattr(vector_store, "compact_in_background", lambda: None)
+    monkeypatch.setattr(embedder, "encode_cached", lambda texts, **_: fake_embed(texts))
+    monkeypatch.setattr(embedder, "encode_queries", lambda queries: fake_embed(queries))
+    monkeypatch.setattr(chunker, "CHUNK_MODE", "words")
+    return tmp_path
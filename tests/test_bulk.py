@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.embeddings import doc_registry, vector_store
+from backend.ingestion import bulk, pdf_loader
+from backend.ingestion.web_cache_loader import WebText
+
+PAGES = {
+    "https://a.example/": "Alpha page. " * 50,
+    "https://a.example/b": "Beta page. " * 50,
+}
+
+
+def fake_fetch(monkeypatch) -> None:
+    def get_web_texts(urls, concurrency=None, per_host=None):
+        return [WebText(url, PAGES[url]) for url in urls]
+
+    def crawl(start_url, options, stats=None):
+        # Every crawl reaches both pages.
+        for url in PAGES:
+            yield WebText(url, PAGES[url])
+
+    monkeypatch.setattr(bulk, "get_web_texts", get_web_texts)
+    monkeypatch.setattr(bulk, "crawl", crawl)
+
+
+def test_url_listed_and_crawled_is_ingested_once(data_dir, monkeypatch):
+    fake_fetch(monkeypatch)
+    summary = bulk.bulk_ingest(
+        urls=["https://a.example/"], sites=["https://a.example/", "https://a.example/b"]
+    )
+
+    assert (summary.ingested, summary.duplicates, summary.failed) == (2, 3, {})
+    documents = doc_registry.load()
+    for url in PAGES:
+        doc = documents[f"web:{url}"]
+        assert doc.id_ranges and not doc.pending_ranges and not doc.writer
+    store = vector_store.get_store()
+    assert len(store) == sum(d.chunks for d in documents.values())
+
+    again = bulk.bulk_ingest(urls=list(PAGES))
+    assert (again.ingested, again.unchanged) == (0, 2)
+
+
+def test_missing_pdf_dir_is_reported(data_dir):
+    summary = bulk.bulk_ingest(pdf_dir=data_dir / "missing")
+    assert summary.failed == {str(data_dir / "missing"): "no such directory"}
+    assert summary.ingested == 0
+
+
+def test_pdfs_are_hashed_once(data_dir, monkeypatch):
+    pymupdf = pytest.importorskip("pymupdf")
+    pdf_dir = data_dir / "pdfs"
+    pdf_dir.mkdir()
+    pdf = pymupdf.open()
+    pdf.new_page().insert_text((72, 72), "Gamma page. " * 5)
+    pdf.save(pdf_dir / "gamma.pdf")
+
+    hashed = []
+    file_hash = pdf_loader.file_hash
+    monkeypatch.setattr(bulk, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+    monkeypatch.setattr(pdf_loader, "file_hash", lambda path: hashed.append(path) or file_hash(path))
+    summary = bulk.bulk_ingest(pdf_dir=pdf_dir)
+
+    assert (summary.ingested, summary.failed) == (1, {})
+    assert hashed == [pdf_dir / "gamma.pdf"]
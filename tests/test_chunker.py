@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast
+
+from backend.processing.chunker import token_chunk_spans
+
+
+def _tokenizer() -> PreTrainedTokenizerFast:
+    vocab = {"[UNK]": 0, "word": 1, "a": 2, "##a": 3, "tail": 4}
+    model = models.WordPiece(vocab, unk_token="[UNK]", max_input_chars_per_word=10_000)
+    tok = Tokenizer(model)
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]")
+
+
+def test_long_word_after_short_words_does_not_crawl():
+    tokenizer = _tokenizer()
+    text = "word " * 10 + "a" * 3000 + " tail"
+    spans = token_chunk_spans(text, tokenizer, max_tokens=254, overlap=48)
+
+    assert spans[0] == (0, 49)
+    starts = [s for s, _ in spans]
+    assert starts == sorted(set(starts))
+    # The 3000-token word needs about 3000 / (254 - 48) windows, not one per short word.
+    assert len(spans) <= 3000 // (254 - 48) + 3
+    assert spans[-1][1] == len(text)
+    for start, end in spans:
+        n = len(tokenizer(text[start:end], add_special_tokens=False)["input_ids"])
+        assert 0 < n <= 254
+
+
+def test_paragraphs_fit_window_and_cover_text():
+    tokenizer = _tokenizer()
+    text = "\n\n".join(" ".join(["word"] * 30) for _ in range(20))
+    spans = token_chunk_spans(text, tokenizer, max_tokens=100, overlap=10)
+
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    for start, end in spans:
+        assert len(text[start:end].split()) <= 100
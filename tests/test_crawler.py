@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from urllib.parse import urljoin
+
+import pytest
+
+from backend.ingestion import crawler
+from backend.ingestion.crawler import CrawlOptions, CrawlStats, crawl
+from backend.ingestion.web_cache_loader import WebText
+
+# url -> (text, links, rel=canonical)
+SITE = {
+    "https://docs.example.com/": (
+        "home", ["/a", "/b", "/private/x", "https://other.example.com/o"], None
+    ),
+    "https://docs.example.com/a": ("page a", ["/a/deep", "/b#section", "/logo.png"], None),
+    "https://docs.example.com/b": ("page b", ["/a"], None),
+    "https://docs.example.com/a/deep": ("deep", ["/a/deeper", "/a/copy", "/a/alias"], None),
+    "https://docs.example.com/a/deeper": ("deeper", [], None),
+    "https://docs.example.com/a/copy": ("deep", [], None),
+    "https://docs.example.com/a/alias": ("alias text", [], "https://docs.example.com/a/deep"),
+    "https://docs.example.com/private/x": ("secret", [], None),
+    "https://other.example.com/o": ("other site", ["/o/private"], None),
+    "https://other.example.com/o/private": ("other secret", [], None),
+}
+
+
+@pytest.fixture
+def fetched(monkeypatch) -> list[str]:
+    """Serve `SITE` instead of the network; returns the fetched URLs in order."""
+    urls: list[str] = []
+
+    def get_web_texts(batch, concurrency, per_host):
+        out = []
+        for url in batch:
+            urls.append(url)
+            if url not in SITE:
+                out.append(WebText(url, None, error="404"))
+                continue
+            text, links, canonical = SITE[url]
+            links = tuple(urljoin(url, link) for link in links)
+            out.append(WebText(url, text, links=links, canonical=canonical))
+        return out
+
+    monkeypatch.setattr(crawler, "get_web_texts", get_web_texts)
+    return urls
+
+
+def no_private(url: str) -> bool:
+    return "/private" not in url
+
+
+def test_depth_limit(fetched):
+    pages = list(crawl("https://docs.example.com/", CrawlOptions(max_depth=1), robots=no_private))
+    assert [p.url for p in pages] == [
+        "https://docs.example.com/",
+        "https://docs.example.com/a",
+        "https://docs.example.com/b",
+    ]
+
+
+def test_max_pages(fetched):
+    options = CrawlOptions(max_depth=5, max_pages=2)
+    pages = list(crawl("https://docs.example.com/", options, robots=no_private))
+    assert len(pages) == 2
+    assert len(fetched) == 2
+
+
+def test_dedup_and_disallowed(fetched):
+    stats = CrawlStats()
+    options = CrawlOptions(max_depth=5)
+    pages = list(crawl("https://docs.example.com/", options, robots=no_private, stats=stats))
+    urls = [p.url for p in pages]
+
+    # "/b#section" is "/b"; "/logo.png" is skipped; other sites are outside the default prefix.
+    assert urls == [
+        "https://docs.example.com/",
+        "https://docs.example.com/a",
+        "https://docs.example.com/b",
+        "https://docs.example.com/a/deep",
+        "https://docs.example.com/a/deeper",
+    ]
+    assert fetched.count("https://docs.example.com/b") == 1
+    # "/a/copy" repeats "/a/deep"'s content and "/a/alias" declares it as canonical.
+    assert stats.duplicates == 2
+    assert stats.disallowed == 1
+    assert "https://docs.example.com/private/x" not in fetched
+
+
+def test_allow_prefixes(fetched):
+    options = CrawlOptions(
+        max_depth=5, allow_prefixes=("https://docs.example.com/a", "https://other.example.com/")
+    )
+    pages = list(crawl("https://docs.example.com/", options, robots=no_private))
+    urls = {p.url for p in pages}
+    assert "https://docs.example.com/b" not in urls
+    assert {"https://docs.example.com/a/deep", "https://other.example.com/o"} <= urls
+    assert "https://other.example.com/o/private" not in fetched
+
+
+def test_disallowed_start(fetched):
+    stats = CrawlStats()
+    assert list(crawl("https://docs.example.com/private/x", robots=no_private, stats=stats)) == []
+    assert stats.disallowed == 1
+    assert fetched == []
+
+
+def test_robots_read_per_site(fetched, monkeypatch):
+    looked_up: list[str] = []
+
+    def site_robots(url):
+        looked_up.append(url)
+        if "other.example.com" in url:
+            return lambda link: "/private" not in link
+        return lambda link: True
+
+    monkeypatch.setattr(crawler, "site_robots", site_robots)
+    options = CrawlOptions(
+        max_depth=5, allow_prefixes=("https://docs.example.com/", "https://other.example.com/")
+    )
+    urls = {p.url for p in crawl("https://docs.example.com/", options)}
+
+    assert looked_up == ["https://docs.example.com/", "https://other.example.com/"]
+    assert "https://docs.example.com/private/x" in urls
+    assert "https://other.example.com/o" in urls
+    assert "https://other.example.com/o/private" not in fetched
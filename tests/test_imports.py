@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_cli_modules_import_without_model_or_faiss():
+    # The PDF extraction pool (spawn) re-imports the main module in every
+    # worker, so the CLIs must not pull in torch or FAISS at import time.
+    code = (
+        "import sys\n"
+        "import backend.app, backend.ingestion.bulk, backend.ingestion.pipeline\n"
+        "heavy = ('faiss', 'torch', 'sentence_transformers')\n"
+        "print(' '.join(m for m in heavy if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
+
+
+def test_chunk_benchmark_does_not_load_the_embedder():
+    code = (
+        "import sys\n"
+        "import backend.processing.chunk_benchmark\n"
+        "heavy = ('backend.embeddings.embedder', 'transformers')\n"
+        "print(' '.join(m for m in heavy if m in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
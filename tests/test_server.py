@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("faiss")
+
+import httpx  # noqa: E402
+
+from backend import server, ui_api  # noqa: E402
+from backend.embeddings import doc_registry, vector_store  # noqa: E402
+from backend.embeddings.vector_store import DocumentWriter  # noqa: E402
+
+URL = "https://docs.example/page"
+
+
+@pytest.fixture
+def slow_page(data_dir, monkeypatch):
+    def get_web_text(url: str) -> str:
+        time.sleep(0.2)  # keep the first ingest running while the second arrives
+        return "Some documentation text. " * 40
+
+    monkeypatch.setattr(ui_api, "get_web_text", get_web_text)
+
+
+async def post_twice() -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(
+            *(client.post("/ingest/url", json={"url": URL}) for _ in range(2))
+        )
+
+
+def test_concurrent_ingests_of_one_url(slow_page):
+    responses = asyncio.run(post_twice())
+
+    assert [r.status_code for r in responses] == [200, 200]
+    messages = sorted(r.json()["message"] for r in responses)
+    assert messages[0].startswith("Already ingested (unchanged)")
+    assert messages[1].startswith("Ingested URL")
+    doc = doc_registry.load()[f"web:{URL}"]
+    assert doc.id_ranges and not doc.pending_ranges and not doc.writer
+    assert len(vector_store.get_store()) == doc.chunks
+
+
+def test_ingest_of_a_busy_document_is_refused(slow_page):
+    # Another worker process is writing the same document.
+    other = DocumentWriter(f"web:{URL}", "other")
+    assert other.begin()
+
+    assert [r.status_code for r in asyncio.run(post_twice())] == [409, 409]
+    other.abort()
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from dataclasses import replace
+import socket
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from backend.embeddings import doc_registry, record_store, vector_log, vector_store  # noqa: E402
+from backend.embeddings.record_store import SearchFilter  # noqa: E402
+from backend.embeddings.vector_store import DocumentBusyError, DocumentWriter  # noqa: E402
+
+from conftest import fake_embed  # noqa: E402
+
+
+def records(doc_id: str, *texts: str) -> list[dict]:
+    return [{"text": t, "source": doc_id, "doc_id": doc_id} for t in texts]
+
+
+def write(writer: DocumentWriter, *texts: str) -> None:
+    writer.write(fake_embed(list(texts)), records(writer.doc_id, *texts))
+
+
+def live_texts() -> list[str]:
+    store = vector_store.get_store()
+    hits, _ = store.search_vectors(fake_embed(["q"]), len(store) + 10)
+    return sorted(h["text"] for h in hits)
+
+
+def test_second_writer_for_a_document_is_refused(data_dir):
+    first = DocumentWriter("web:x", "h1")
+    assert first.begin()
+    write(first, "a", "b")
+
+    second = DocumentWriter("web:x", "h1")
+    with pytest.raises(DocumentBusyError):
+        second.begin()
+    write(first, "c")
+    assert first.commit() == 3
+
+    doc = doc_registry.load()["web:x"]
+    assert (doc.content_hash, doc.chunks, doc.id_ranges, doc.pending_ranges) == ("h1", 3, ((0, 3),), ())
+    assert not doc.writer
+    assert live_texts() == ["a", "b", "c"]
+    # The same content again is now a no-op.
+    assert not DocumentWriter("web:x", "h1").begin()
+
+
+def test_expired_lease_is_taken_over(data_dir, monkeypatch):
+    monkeypatch.setattr(vector_store, "WRITER_LEASE_SECONDS", -1)
+    stale = DocumentWriter("web:x", "h1")
+    assert stale.begin()
+    write(stale, "old 1", "old 2")
+
+    fresh = DocumentWriter("web:x", "h2")
+    assert fresh.begin()
+    with pytest.raises(DocumentBusyError):
+        write(stale, "old 3")
+    write(fresh, "new")
+    with pytest.raises(DocumentBusyError):
+        stale.commit()
+    stale.abort()
+    fresh.commit()
+
+    doc = doc_registry.load()["web:x"]
+    assert (doc.content_hash, doc.id_ranges) == ("h2", fresh.ranges)
+    assert live_texts() == ["new"]
+
+
+def ingest(doc_id: str, content_hash: str, *texts: str) -> int | None:
+    return vector_store.upsert_document_batches(doc_id, content_hash, [records(doc_id, *texts)])
+
+
+def test_new_version_replaces_the_old(data_dir):
+    assert ingest("pdf:a", "v1", "one", "two") == 2
+    assert ingest("pdf:a", "v1", "one", "two") is None
+    assert ingest("pdf:a", "v2", "three") == 1
+
+    doc = doc_registry.load()["pdf:a"]
+    assert (doc.content_hash, doc.chunks, doc.id_ranges) == ("v2", 1, ((2, 3),))
+    assert live_texts() == ["three"]
+    assert vector_log.read_meta().tombstones == 2
+
+
+def test_delete_document(data_dir):
+    ingest("pdf:a", "v1", "one", "two")
+    ingest("pdf:b", "v1", "three")
+
+    assert vector_store.delete_document("pdf:a") == 2
+    assert vector_store.delete_document("pdf:a") == 0
+    assert "pdf:a" not in doc_registry.load()
+    assert live_texts() == ["three"]
+    assert len(vector_store.get_store()) == 1
+
+
+def test_failed_ingest_is_rolled_back(data_dir):
+    ingest("pdf:a", "v1", "one")
+
+    def batches():
+        yield records("pdf:a", "two")
+        raise RuntimeError("extraction failed")
+
+    with pytest.raises(RuntimeError):
+        vector_store.upsert_document_batches("pdf:a", "v2", batches())
+    doc = doc_registry.load()["pdf:a"]
+    assert (doc.content_hash, doc.pending_ranges, doc.writer) == ("v1", (), "")
+    assert live_texts() == ["one"]
+
+
+def test_crashed_writer_leftovers_are_removed(data_dir):
+    ingest("pdf:a", "v1", "one")
+    crashed = DocumentWriter("pdf:a", "v2")
+    crashed.begin()
+    write(crashed, "half", "written")
+    # The writer's process dies before committing.
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    documents = doc_registry.load()
+    documents["pdf:a"] = replace(documents["pdf:a"], writer=f"{socket.gethostname()}:{dead.pid}:x")
+    doc_registry.save(documents)
+    assert live_texts() == ["half", "one", "written"]
+
+    assert ingest("pdf:a", "v2", "whole") == 1
+    doc = doc_registry.load()["pdf:a"]
+    assert (doc.content_hash, doc.id_ranges, doc.pending_ranges) == ("v2", ((3, 4),), ())
+    assert live_texts() == ["whole"]
+
+
+def test_reclaim_keeps_ids_and_drops_deleted_records(data_dir):
+    ingest("pdf:a", "v1", "alpha one", "alpha two")
+    ingest("pdf:b", "v1", "beta one", "beta two")
+    store = vector_store.get_store()
+    before, _ = store.search_vectors(fake_embed(["beta one"]), 4)
+    vector_store.delete_document("pdf:a")
+
+    vector_store.reclaim()
+
+    meta = vector_log.read_meta()
+    assert (meta.rows, meta.tombstones, meta.next_id) == (2, 0, 4)
+    after, distances = store.search_vectors(fake_embed(["beta one"]), 4)
+    assert [h["id"] for h in after] == [h["id"] for h in before if h["doc_id"] == "pdf:b"]
+    assert sorted(h["id"] for h in after) == [2, 3]
+    assert distances[0] == pytest.approx(0.0)
+    assert record_store.fetch([0, 1]) == []
+    hits, _ = store.search_hybrid(fake_embed(["alpha"]), "alpha", 5)
+    assert [h["doc_id"] for h in hits] == ["pdf:b", "pdf:b"]
+    # New chunks continue after the highest id ever assigned.
+    ingest("pdf:c", "v1", "gamma")
+    assert doc_registry.load()["pdf:c"].id_ranges == ((4, 5),)
+
+
+def nearest(store: vector_store.VectorStore, text: str, k: int = 10) -> list[tuple[int, str]]:
+    hits, _ = store.search_vectors(fake_embed([text]), k)
+    return [(h["id"], h["text"]) for h in hits]
+
+
+def test_compaction_folds_the_tail_into_the_index(data_dir):
+    ingest("pdf:a", "v1", "one", "two")
+    ingest("pdf:b", "v1", "three", "four", "five")
+    vector_store.delete_document("pdf:a")
+    store = vector_store.get_store()
+    before = nearest(store, "four")
+    assert vector_log.read_meta().tail_rows > 0
+
+    vector_store.compact()
+
+    meta = vector_log.read_meta()
+    assert (meta.indexed_rows, meta.rows, meta.tail_rows) == (5, 5, 0)
+    assert vector_log.read_index().ntotal == 5
+    assert nearest(store, "four") == before
+    assert nearest(vector_store.VectorStore(), "four") == before
+    # Nothing appended since: a second pass leaves the index alone.
+    vector_store.compact()
+    assert vector_log.read_meta().index_epoch == meta.index_epoch
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_resident_store_catches_up_with_other_writers(data_dir, monkeypatch, mmap):
+    monkeypatch.setattr(vector_store, "INDEX_MMAP", mmap)
+    ingest("pdf:a", "v1", "one", "two")
+    resident = vector_store.VectorStore()
+    assert len(resident) == 2
+
+    def check() -> None:
+        assert nearest(resident, "three") == nearest(vector_store.VectorStore(), "three")
+
+    ingest("pdf:b", "v1", "three", "four")
+    check()
+    assert len(resident) == 4
+
+    vector_store.delete_document("pdf:a")
+    check()
+    assert len(resident) == 2
+
+    vector_store.compact()
+    ingest("pdf:c", "v1", "five")
+    check()
+    assert len(resident) == 3
+
+    vector_store.reclaim()
+    check()
+    assert sorted(text for _, text in nearest(resident, "three")) == ["five", "four", "three"]
+
+
+@pytest.mark.parametrize("exact_rows", [0, 100])
+def test_filtered_search_reuses_matches_until_the_data_changes(data_dir, monkeypatch, exact_rows):
+    monkeypatch.setattr(vector_store, "FILTER_EXACT_ROWS", exact_rows)
+    lookups = []
+    matching_ids = record_store.matching_ids
+    monkeypatch.setattr(
+        record_store, "matching_ids", lambda where: lookups.append(where) or matching_ids(where)
+    )
+    ingest("pdf:a", "v1", "one", "two")
+    ingest("pdf:b", "v1", "three")
+    vector_store.compact()
+    ingest("pdf:b", "v2", "four", "five")
+    store = vector_store.get_store()
+    where = SearchFilter(doc_id="pdf:b")
+
+    def texts() -> list[str]:
+        hits, _ = store.search_vectors(fake_embed(["one"]), 10, where=where)
+        return sorted(h["text"] for h in hits)
+
+    assert texts() == ["five", "four"]
+    hits, _ = store.search_hybrid(fake_embed(["four"]), "four", 10, where=where)
+    assert sorted(h["text"] for h in hits) == ["five", "four"]
+    assert len(lookups) == 1
+
+    vector_store.delete_document("pdf:a")
+    ingest("pdf:b", "v3", "six")
+    assert texts() == ["six"]
+    assert len(lookups) == 2
+
+
+def test_compaction_extends_an_index_too_small_to_train(data_dir, monkeypatch):
+    ingest("pdf:a", "v1", "one", "two")
+    vector_store.compact("ivf_flat")
+    meta = vector_log.read_meta()
+    # Two rows cannot train IVF lists: the index falls back to brute force.
+    assert (meta.index_type, meta.requested_type) == ("flat", "ivf_flat")
+
+    rebuilds = []
+    new_index = vector_log.new_index
+    monkeypatch.setattr(
+        vector_log, "new_index", lambda *args: rebuilds.append(args[0]) or new_index(*args)
+    )
+    ingest("pdf:b", "v1", "three")
+    vector_store.compact()
+
+    meta = vector_log.read_meta()
+    assert rebuilds == []
+    assert (meta.index_type, meta.indexed_rows, meta.rows) == ("flat", 3, 3)
+    assert live_texts() == ["one", "three", "two"]
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.ingestion.web_loader import parse_page
+
+pytest.importorskip("lxml")
+
+
+def test_pre_keeps_indentation():
+    html = (
+        "<html><body><h1> Title </h1><p>para  one\n  two</p>"
+        "<pre>  code\n   indented</pre><div> after </div></body></html>"
+    )
+    text = parse_page(html, "https://example.com/", parser="lxml").text
+    assert text == "Title\n\npara one two\n\n  code\n   indented\n\nafter"